@@ -2,46 +2,92 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_cors import CORS
 import os
+from .config import Config
 
 db = SQLAlchemy()
 
-def create_app():
+def create_app(config_class=Config):
     app = Flask(__name__)
     CORS(app)
+    app.config.from_object(config_class)
 
-    # Configure the database
-    db_path = os.path.expanduser('~/TradeNote/tradenote.db')
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
-    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-    app.config['JWT_SECRET_KEY'] = 'your-secret-key'  # Change this!
-    app.config['UPLOAD_FOLDER'] = os.path.expanduser('~/TradeNote/uploads')
+    from .utils.engine import engine_options, init_engine, sqlite_database_path
+    app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', engine_options(app.config))
+    db_path = sqlite_database_path(app.config['SQLALCHEMY_DATABASE_URI'])
+    if db_path:
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
+    os.makedirs(app.config['AVATAR_FOLDER'], exist_ok=True)
 
     db.init_app(app)
 
     with app.app_context():
+        init_engine(app)
+
         # Import models to ensure they are registered with SQLAlchemy
         from .models.user import User
         from .models.note import Note
         from .models.trade import Trade
         from .models.playbook import Playbook
+        from .models.rollup import DailyPnl, MonthlyPnl
+        from .models.screenshot import Screenshot
+        from .models.data_version import DataVersion
+        from .models.label import TradeConfluence, PlaybookLabel
+        from .models.playbook_stats import PlaybookStats
 
         db.create_all()
 
+        from .migrations import upgrade_schema
+        upgrade_schema()
+
+        from .utils.rollups import ensure_rollups
+        ensure_rollups()
+
+        from .utils.labels import ensure_labels
+        ensure_labels()
+
         # Register Blueprints
         from .routes.auth import auth_bp
         from .routes.notes import notes_bp
         from .routes.events import events_bp
         from .routes.trades import trades_bp
         from .routes.playbooks import playbooks_bp
+        from .routes.system import system_bp
+        from .routes.search import search_bp
+        from .routes.batch import batch_bp
 
         app.register_blueprint(auth_bp, url_prefix='/auth')
         app.register_blueprint(notes_bp, url_prefix='/notes')
-        app.register_blueprint(events_bp, url_prefix='/')
+        app.register_blueprint(events_bp, url_prefix='/events')
         app.register_blueprint(trades_bp, url_prefix='/trades')
         app.register_blueprint(playbooks_bp, url_prefix='/playbooks')
+        app.register_blueprint(system_bp, url_prefix='/system')
+        app.register_blueprint(search_bp, url_prefix='/search')
+        app.register_blueprint(batch_bp, url_prefix='/batch')
+
+        from .utils.auth import init_auth_cache
+        init_auth_cache(app)
+
+        from .utils.trade_cache import init_trade_cache
+        init_trade_cache(app)
+
+        from .utils.changes import init_change_feed
+        init_change_feed(app)
+
+        from .utils.passwords import init_password_hasher
+        init_password_hasher(app)
+
+        from .utils.thumbnails import init_renditions
+        init_renditions(app)
+
+        from .utils.calendar import init_calendar
+        init_calendar(app)
+
+        from .utils.serializers import init_json
+        init_json(app)
+
+        from .commands import register_commands
+        register_commands(app)
 
 
     return app
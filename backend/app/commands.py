@@ -0,0 +1,50 @@
+import click
+from flask.cli import with_appcontext
+from app.utils.rollups import rebuild_rollups, check_rollups
+from app.utils.search import rebuild_search_index
+from app.utils.labels import rebuild_labels
+from app.utils.playbook_stats import clear_stats
+
+@click.command('rebuild-rollups')
+@click.option('--user-id', type=int, default=None, help='Only rebuild rollups for this user.')
+@click.option('--check', is_flag=True, help='Report rows that differ from a fresh recomputation without writing.')
+@with_appcontext
+def rebuild_rollups_command(user_id, check):
+    """Recompute the daily and monthly P&L rollups from the trade table."""
+    if check:
+        mismatches = check_rollups(user_id)
+        for model, row_user_id, key in sorted(mismatches, key=lambda m: (m[0].__name__, m[1], m[2])):
+            click.echo(f'{model.__tablename__} user={row_user_id} key={key} is out of date')
+        click.echo(f'{len(mismatches)} mismatched rollup rows')
+        if mismatches:
+            raise SystemExit(1)
+        return
+    count = rebuild_rollups(user_id)
+    click.echo(f'Rebuilt {count} rollup rows')
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index_command():
+    """Repopulate the full-text search index from the note and trade tables."""
+    rebuild_search_index()
+    click.echo('Rebuilt search index')
+
+@click.command('rebuild-labels')
+@with_appcontext
+def rebuild_labels_command():
+    """Recompute the confluence and tag index from the trade and playbook tables."""
+    count = rebuild_labels()
+    click.echo(f'Rebuilt {count} label rows')
+
+@click.command('clear-playbook-stats')
+@with_appcontext
+def clear_playbook_stats_command():
+    """Drop the cached per-playbook stats; they are recomputed on the next read."""
+    count = clear_stats()
+    click.echo(f'Removed {count} cached playbook stats rows')
+
+def register_commands(app):
+    app.cli.add_command(rebuild_rollups_command)
+    app.cli.add_command(rebuild_search_index_command)
+    app.cli.add_command(rebuild_labels_command)
+    app.cli.add_command(clear_playbook_stats_command)
@@ -1,8 +1,78 @@
 import os
 
+def env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+def env_bool(name, default):
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    return value.lower() in ('1', 'true', 'yes', 'on')
+
+DATA_DIR = os.environ.get('TRADENOTE_DATA_DIR') or os.path.expanduser('~/TradeNote')
+
 class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or 'a-very-secret-key'
-    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(os.path.expanduser('~/TradeNote'), 'tradenote.db')
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(DATA_DIR, 'tradenote.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    UPLOAD_FOLDER = os.path.join(os.path.expanduser('~/TradeNote'), 'uploads')
+    UPLOAD_FOLDER = os.path.join(DATA_DIR, 'uploads')
     JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY') or 'jwt-secret-string'
+
+    # Connection pool. SQLite file databases use a QueuePool as well, so the
+    # sizes apply to both; pre-ping and recycling only matter for servers
+    # that drop idle connections.
+    DB_POOL_SIZE = env_int('DB_POOL_SIZE', 5)
+    DB_MAX_OVERFLOW = env_int('DB_MAX_OVERFLOW', 10)
+    DB_POOL_TIMEOUT = env_int('DB_POOL_TIMEOUT', 30)
+    DB_POOL_RECYCLE = env_int('DB_POOL_RECYCLE', 1800)
+    DB_POOL_PRE_PING = env_bool('DB_POOL_PRE_PING', True)
+
+    # Applied to every new SQLite connection. WAL lets readers proceed while
+    # an import is writing; NORMAL sync is durable in WAL mode except for the
+    # last transactions before a power loss.
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE') or 'WAL'
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS') or 'NORMAL'
+    SQLITE_BUSY_TIMEOUT = env_int('SQLITE_BUSY_TIMEOUT', 5000)  # milliseconds
+    SQLITE_MMAP_SIZE = env_int('SQLITE_MMAP_SIZE', 256 * 1024 * 1024)  # bytes
+    SQLITE_CACHE_SIZE = env_int('SQLITE_CACHE_SIZE', -64000)  # negative values are KiB
+    SQLITE_FOREIGN_KEYS = env_bool('SQLITE_FOREIGN_KEYS', True)
+
+    # 'auto' uses orjson when it is installed, 'orjson' requires it and
+    # 'json' always uses the standard library encoder
+    JSON_BACKEND = os.environ.get('JSON_BACKEND') or 'auto'
+
+    # Economic calendar CSV/JSON files, re-read when they change
+    EVENTS_FOLDER = os.path.join(DATA_DIR, 'events')
+    EVENTS_RELOAD_INTERVAL = 2  # seconds between mtime checks
+    EVENTS_MAX_AGE = 300  # seconds
+
+    # Werkzeug hash method with its cost parameters, e.g. pbkdf2:sha256:1000000
+    # or scrypt:32768:8:1. Changing it rehashes each password at its next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD') or 'pbkdf2:sha256'
+    PASSWORD_HASH_WORKERS = env_int('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1))  # 0 hashes inline
+    PASSWORD_HASH_QUEUE_SIZE = env_int('PASSWORD_HASH_QUEUE_SIZE', 16)
+    PASSWORD_HASH_QUEUE_TIMEOUT = env_int('PASSWORD_HASH_QUEUE_TIMEOUT', 5)  # seconds
+
+    # Each active user's trades are kept in memory as columns to answer the
+    # trade list and analytics; 0 disables it. Users with more trades than
+    # TRADE_CACHE_MAX_TRADES only get the columns analytics needs.
+    TRADE_CACHE_SIZE = env_int('TRADE_CACHE_SIZE', 128 * 1024 * 1024)  # bytes
+    TRADE_CACHE_MAX_TRADES = env_int('TRADE_CACHE_MAX_TRADES', 250000)
+
+    # GET /events/stream. Each open stream holds a server thread, so streams
+    # are capped per user and closed after EVENT_STREAM_MAX_AGE; browsers
+    # reconnect on their own. A stream that falls EVENT_STREAM_QUEUE_SIZE
+    # changes behind gets a single reset event instead.
+    EVENT_STREAM_QUEUE_SIZE = env_int('EVENT_STREAM_QUEUE_SIZE', 100)
+    EVENT_STREAM_MAX_CONNECTIONS = env_int('EVENT_STREAM_MAX_CONNECTIONS', 8)  # per user
+    EVENT_STREAM_HEARTBEAT = env_int('EVENT_STREAM_HEARTBEAT', 15)  # seconds
+    EVENT_STREAM_MAX_AGE = env_int('EVENT_STREAM_MAX_AGE', 300)  # seconds
+
+    AVATAR_FOLDER = os.path.join(DATA_DIR, 'avatars')
+    AVATAR_MAX_BYTES = 2 * 1024 * 1024
+    THUMBNAIL_WORKERS = env_int('THUMBNAIL_WORKERS', 2)
+    THUMBNAIL_QUEUE_SIZE = 64
+    IMPORT_BATCH_SIZE = 1000
+    AUTH_CACHE_SIZE = 1024
+    AUTH_CACHE_TTL = 60  # seconds
@@ -0,0 +1,73 @@
+import base64
+import binascii
+from flask import current_app
+from sqlalchemy import inspect, text
+from app import db
+from app.models.playbook_stats import PlaybookStats
+from app.utils.search import create_search_index
+from app.utils.storage import store_bytes
+
+def create_missing_indexes():
+    # create_all() only creates indexes together with new tables, so indexes
+    # added to existing models have to be created separately
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_indexes = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                index.create(bind=db.engine)
+
+def add_missing_columns():
+    # New nullable columns on existing tables are added in place; anything
+    # more involved needs a dedicated migration function below
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing_columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+def migrate_avatars():
+    # Avatars used to be stored inline as base64 in user.avatar; move them to
+    # the blob store and keep only the hash on the row
+    inspector = inspect(db.engine)
+    if 'avatar' not in {column['name'] for column in inspector.get_columns('user')}:
+        return
+    with db.engine.begin() as connection:
+        rows = connection.execute(text('SELECT id, avatar FROM "user" WHERE avatar IS NOT NULL')).all()
+        for user_id, avatar in rows:
+            value = avatar.split(',', 1)[1] if avatar.startswith('data:') else avatar
+            try:
+                avatar_hash = store_bytes(current_app.config['AVATAR_FOLDER'], base64.b64decode(value))
+            except (binascii.Error, ValueError):
+                avatar_hash = None
+            connection.execute(text('UPDATE "user" SET avatar_hash = :hash, avatar = NULL WHERE id = :id'),
+                               {'hash': avatar_hash, 'id': user_id})
+
+def migrate_playbook_stats():
+    # The stats cache used to be keyed by setup_grade and summed unsigned
+    # risk_reward; it only holds derived data, so rebuild it empty
+    inspector = inspect(db.engine)
+    table = PlaybookStats.__table__
+    if table.name not in inspector.get_table_names():
+        return
+    if 'setup_type' in {column['name'] for column in inspector.get_columns(table.name)}:
+        return
+    table.drop(bind=db.engine)
+    table.create(bind=db.engine)
+
+def upgrade_schema():
+    migrate_playbook_stats()
+    add_missing_columns()
+    create_missing_indexes()
+    migrate_avatars()
+    create_search_index()
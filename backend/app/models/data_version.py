@@ -0,0 +1,6 @@
+from app import db
+
+class DataVersion(db.Model):
+    """Per-user counter bumped on every write to trades, notes or playbooks."""
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
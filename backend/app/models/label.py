@@ -0,0 +1,23 @@
+from app import db
+
+# Confluences and tags are stored as JSON lists on trades and playbooks; these
+# tables mirror them one row per label so they can be filtered and grouped in SQL.
+
+class TradeConfluence(db.Model):
+    __table_args__ = (
+        db.Index('ix_trade_confluence_trade_id', 'trade_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    label = db.Column(db.String(100), primary_key=True)
+    trade_id = db.Column(db.Integer, db.ForeignKey('trade.id'), primary_key=True)
+
+class PlaybookLabel(db.Model):
+    __table_args__ = (
+        db.Index('ix_playbook_label_playbook_id', 'playbook_id'),
+    )
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)  # 'confluence' or 'tag'
+    label = db.Column(db.String(100), primary_key=True)
+    playbook_id = db.Column(db.Integer, db.ForeignKey('playbook.id'), primary_key=True)
@@ -1,9 +1,17 @@
 from app import db
 from datetime import datetime
 
+EXCERPT_LENGTH = 200
+
 class Note(db.Model):
+    __table_args__ = (
+        db.Index('ix_note_user_created_at', 'user_id', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(100), nullable=False)
     content = db.Column(db.Text, nullable=False)
+    # Computed by the database so listing notes doesn't read the full content into Python
+    excerpt = db.column_property(db.func.substr(content, 1, EXCERPT_LENGTH), deferred=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
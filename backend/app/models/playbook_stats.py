@@ -0,0 +1,16 @@
+from app import db
+
+class PlaybookStats(db.Model):
+    """Cached trade aggregates per playbook and trade setup type.
+
+    A playbook without trades keeps a single row with an empty setup_type
+    and zero counts, so "no rows" always means "not computed yet".
+    r_multiple_sum adds up each trade's realized R (see analytics.r_multiple_sql).
+    """
+    playbook_id = db.Column(db.Integer, db.ForeignKey('playbook.id'), primary_key=True)
+    setup_type = db.Column(db.String(50), primary_key=True)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    r_multiple_sum = db.Column(db.Float, nullable=False, default=0.0)
+    net_pnl = db.Column(db.Float, nullable=False, default=0.0)
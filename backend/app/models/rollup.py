@@ -0,0 +1,21 @@
+from app import db
+
+class DailyPnl(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    gross_profit = db.Column(db.Float, nullable=False, default=0.0)
+    gross_loss = db.Column(db.Float, nullable=False, default=0.0)
+    net_pnl = db.Column(db.Float, nullable=False, default=0.0)
+
+class MonthlyPnl(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.Date, primary_key=True)  # First day of the month
+    trade_count = db.Column(db.Integer, nullable=False, default=0)
+    wins = db.Column(db.Integer, nullable=False, default=0)
+    losses = db.Column(db.Integer, nullable=False, default=0)
+    gross_profit = db.Column(db.Float, nullable=False, default=0.0)
+    gross_loss = db.Column(db.Float, nullable=False, default=0.0)
+    net_pnl = db.Column(db.Float, nullable=False, default=0.0)
@@ -0,0 +1,9 @@
+from app import db
+from datetime import datetime
+
+class Screenshot(db.Model):
+    # One row per stored image; trades reference it as "<hash>.<ext>" in screenshot_filename
+    hash = db.Column(db.String(64), primary_key=True)
+    size = db.Column(db.Integer, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -1,6 +1,15 @@
 from app import db
 
 class Trade(db.Model):
+    __table_args__ = (
+        db.Index('ix_trade_user_entry_datetime', 'user_id', 'entry_datetime'),
+        db.Index('ix_trade_user_screenshot_filename', 'user_id', 'screenshot_filename'),
+        db.Index('ix_trade_user_playbook_id', 'user_id', 'playbook_id'),
+        db.Index('ix_trade_user_models', 'user_id', 'entry_model', 'trade_model'),
+        # Covers GET /trades/analytics, which reads only these columns for every trade
+        db.Index('ix_trade_user_analytics', 'user_id', 'entry_datetime', 'total_pnl', 'risk_reward', 'result'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     ticker = db.Column(db.String(20), nullable=False)
     result = db.Column(db.String(20), nullable=False)
@@ -19,4 +28,5 @@ class Trade(db.Model):
     trade_note = db.Column(db.Text, nullable=True)
     roadmap = db.Column(db.Text, nullable=True)
     screenshot_filename = db.Column(db.String(255), nullable=True)
+    playbook_id = db.Column(db.String(50), db.ForeignKey('playbook.playbook_id'), nullable=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
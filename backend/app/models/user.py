@@ -3,7 +3,7 @@ from app import db
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(50), unique=True, nullable=False)
-    password = db.Column(db.String(80), nullable=False)
-    avatar = db.Column(db.Text, nullable=True)  # To store base64 encoded avatar
+    password = db.Column(db.String(255), nullable=False)
+    avatar_hash = db.Column(db.String(64), nullable=True)  # sha256 of the avatar blob in AVATAR_FOLDER
     notes = db.relationship('Note', backref='author', lazy=True)
     playbooks = db.relationship('Playbook', backref='author', lazy=True)
@@ -1,21 +1,38 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, send_file, abort
 import jwt
+import os
 import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app.models.user import User
 from app import db
 from flask import current_app
 from app.utils.auth import token_required
+from app.utils.avatars import decode_avatar, save_avatar, avatar_url
+from app.utils.passwords import HasherBusy, password_hasher
+from app.utils.storage import is_valid_hash, blob_path, detect_mimetype
+
+AVATAR_MAX_AGE = 365 * 24 * 60 * 60
+BUSY_RETRY_AFTER = 1  # seconds
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(HasherBusy)
+def hasher_busy(e):
+    response = jsonify({'message': 'Too many sign-ins at once, please retry shortly.'})
+    response.headers['Retry-After'] = str(BUSY_RETRY_AFTER)
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
     if User.query.filter_by(username=data['username']).first():
         return jsonify({'message': 'Username already exists'}), 409
-    hashed_password = generate_password_hash(data['password'], method='pbkdf2:sha256')
-    new_user = User(username=data['username'], password=hashed_password, avatar=data.get('avatar'))
+    hashed_password = password_hasher().hash(data['password'])
+    new_user = User(username=data['username'], password=hashed_password)
+    if data.get('avatar'):
+        try:
+            save_avatar(new_user, decode_avatar(data['avatar']))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
     db.session.add(new_user)
     db.session.commit()
     return jsonify({'message': 'New user created!'}), 201
@@ -30,7 +47,12 @@ def login():
     if not user:
         return jsonify({'message': 'Could not verify'}), 401
 
-    if check_password_hash(user.password, auth.password):
+    hasher = password_hasher()
+    if hasher.verify(user.password, auth.password):
+        if hasher.needs_rehash(user.password):
+            # The hash settings changed since this password was stored
+            user.password = hasher.hash(auth.password)
+            db.session.commit()
         token = jwt.encode({
             'id': user.id,
             'exp': datetime.datetime.utcnow() + datetime.timedelta(minutes=30)
@@ -45,15 +67,37 @@ def upload_avatar(current_user):
     data = request.get_json()
     if 'avatar' not in data:
         return jsonify({'message': 'No avatar data'}), 400
-    current_user.avatar = data['avatar']
+    try:
+        avatar = decode_avatar(data['avatar'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    user = db.session.get(User, current_user.id)
+    save_avatar(user, avatar)
     db.session.commit()
-    return jsonify({'message': 'Avatar updated!'})
+    return jsonify({'message': 'Avatar updated!', 'avatar_url': avatar_url(user)})
+
+@auth_bp.route('/avatar/<avatar_hash>', methods=['GET'])
+def get_avatar(avatar_hash):
+    # Avatars are addressed by content hash, so a URL's bytes never change and
+    # the response can be cached by the browser indefinitely
+    if not is_valid_hash(avatar_hash):
+        abort(404)
+    path = blob_path(current_app.config['AVATAR_FOLDER'], avatar_hash)
+    if not os.path.exists(path):
+        abort(404)
+    with open(path, 'rb') as f:
+        mimetype = detect_mimetype(f.read(16))
+    response = send_file(path, mimetype=mimetype, etag=avatar_hash, max_age=AVATAR_MAX_AGE, conditional=True)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
 
 @auth_bp.route('/user', methods=['GET'])
 @token_required
 def get_user(current_user):
+    user = db.session.get(User, current_user.id)
     user_data = {}
-    user_data['id'] = current_user.id
-    user_data['username'] = current_user.username
-    user_data['avatar'] = current_user.avatar
+    user_data['id'] = user.id
+    user_data['username'] = user.username
+    user_data['avatar_url'] = avatar_url(user)
     return jsonify(user_data)
@@ -0,0 +1,76 @@
+from http import HTTPStatus
+from flask import Blueprint, request, jsonify, current_app, g
+from app.utils.auth import token_required
+from app import db
+
+batch_bp = Blueprint('batch', __name__)
+
+MAX_BATCH_SIZE = 20
+BATCH_METHODS = {'GET'}
+
+def batch_error(status, message):
+    return {'status': status, 'body': {'message': message}}
+
+def dispatch(item):
+    """Run one sub-request through the normal Flask pipeline and return its result entry."""
+    if not isinstance(item, dict):
+        return batch_error(400, 'Each request must be an object.')
+    method = str(item.get('method', 'GET')).upper()
+    path = item.get('path')
+    if method not in BATCH_METHODS:
+        return batch_error(405, 'Only GET requests can be batched.')
+    if not isinstance(path, str) or not path.startswith('/'):
+        return batch_error(400, 'path must be an absolute path such as /trades/.')
+    if path.split('?', 1)[0].rstrip('/') == '/batch':
+        return batch_error(400, 'Batch requests cannot be nested.')
+    query = item.get('query') or {}
+    if not isinstance(query, (dict, str)):
+        return batch_error(400, 'query must be an object or a query string.')
+
+    headers = {}
+    if item.get('etag'):
+        headers['If-None-Match'] = item['etag']
+    # A nested request context reuses the current app context, so g and the
+    # database session are shared with the batch request
+    with current_app.test_request_context(path, method=method, query_string=query,
+                                          headers=headers, base_url=request.host_url):
+        try:
+            response = current_app.full_dispatch_request()
+        except Exception:
+            # One failing item shouldn't take the others down with it
+            current_app.logger.exception('Batched request to %s failed', path)
+            db.session.rollback()
+            return batch_error(500, 'Internal server error.')
+    try:
+        result = {'status': response.status_code}
+        if response.is_json:
+            result['body'] = response.get_json()
+        elif response.status_code >= 400:
+            # Werkzeug's HTML error pages aren't useful inside a JSON payload
+            result['body'] = {'message': HTTPStatus(response.status_code).phrase}
+        elif response.is_streamed:
+            return batch_error(400, 'Streaming responses cannot be batched.')
+        elif response.status_code != 304:
+            result['body'] = response.get_data(as_text=True) if response.mimetype.startswith('text/') else None
+        if response.headers.get('ETag'):
+            result['etag'] = response.headers['ETag']
+        return result
+    finally:
+        response.close()
+
+@batch_bp.route('', methods=['POST'])
+@token_required
+def run_batch(current_user):
+    data = request.get_json(silent=True)
+    items = data.get('requests') if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({'message': 'requests must be a non-empty list.'}), 400
+    if len(items) > MAX_BATCH_SIZE:
+        return jsonify({'message': f'At most {MAX_BATCH_SIZE} requests can be batched.'}), 400
+
+    g.batch_principal = current_user
+    try:
+        responses = [dispatch(item) for item in items]
+    finally:
+        g.pop('batch_principal', None)
+    return jsonify({'responses': responses})
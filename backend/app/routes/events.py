@@ -1,23 +1,82 @@
-from flask import Blueprint, jsonify
+import hashlib
+import json
+import time
+from datetime import date, timedelta
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
+from app.utils.auth import token_required
+from app.utils.changes import change_feed, current_version
 
 events_bp = Blueprint('events', __name__)
 
-@events_bp.route('/', methods=['GET'])
+DEFAULT_WINDOW_DAYS = 30
+STREAM_RETRY_MS = 3000
+
+def server_sent_event(event, data, event_id):
+    return f'event: {event}\nid: {event_id}\ndata: {json.dumps(data)}\n\n'
+
+@events_bp.route('/', methods=['GET'], strict_slashes=False)
 def get_events():
-    mock_response = [
-        {
-            "date": "2024-07-22",
-            "events": [
-                {"type": "earnings", "time": "BMO", "symbol": "UEC", "details": "UEC Uranium Energy Corp Earnings"},
-                {"type": "data", "time": "08:30", "details": "Chicago Fed National Activity Index"}
-            ]
-        },
-        {
-            "date": "2024-07-23",
-            "events": [
-                {"type": "earnings", "time": "BMO", "symbol": "GE", "details": "General Electric Co Earnings"},
-                {"type": "data", "time": "09:00", "details": "S&P Case-Shiller Home Price Index"}
-            ]
-        }
-    ]
-    return jsonify(mock_response)
+    try:
+        start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+        end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+    except ValueError:
+        return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+    if start is None and end is None:
+        start = date.today()
+        end = start + timedelta(days=DEFAULT_WINDOW_DAYS)
+    if start and end and start > end:
+        return jsonify({'message': 'start must not be after end.'}), 400
+
+    query = (
+        start.isoformat() if start else None,
+        end.isoformat() if end else None,
+        request.args.get('type'),
+        request.args.get('symbol')
+    )
+    days, etag, last_modified = current_app.extensions['calendar'].query(*query)
+    response = jsonify(days)
+    if etag:
+        # Same calendar files and same resolved query give the same body
+        response.set_etag(hashlib.sha1(repr((etag, query)).encode()).hexdigest())
+        response.last_modified = last_modified
+    response.cache_control.public = True
+    response.cache_control.max_age = current_app.config['EVENTS_MAX_AGE']
+    return response.make_conditional(request)
+
+@events_bp.route('/stream', methods=['GET'])
+@token_required(query_param='token')
+def stream_changes(current_user):
+    feed = change_feed()
+    subscription = feed.subscribe(current_user.id)
+    if subscription is None:
+        return jsonify({'message': 'Too many open event streams.'}), 429
+    heartbeat = current_app.config['EVENT_STREAM_HEARTBEAT']
+    deadline = time.monotonic() + current_app.config['EVENT_STREAM_MAX_AGE']
+    version = current_version(current_user.id)
+    # Event ids are data versions, so a reconnecting browser sends the last one
+    # it saw and is told to reload if anything changed in between
+    last_seen = request.headers.get('Last-Event-ID')
+    first_event = 'reset' if last_seen and last_seen != str(version) else 'ready'
+
+    def generate():
+        yield f'retry: {STREAM_RETRY_MS}\n' + server_sent_event(first_event, {'version': version}, version)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            change = subscription.get(timeout=min(heartbeat, remaining))
+            if change is None:
+                # Keeps proxies from timing out the connection and notices closed ones
+                yield ': heartbeat\n\n'
+            elif change == 'reset':
+                latest = current_version(current_user.id)
+                yield server_sent_event('reset', {'version': latest}, latest)
+            else:
+                yield server_sent_event('change', change._asdict(), change.version)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    response.headers['X-Accel-Buffering'] = 'no'
+    # Runs even if the client disconnects before the first event is sent
+    response.call_on_close(lambda: feed.unsubscribe(subscription))
+    return response
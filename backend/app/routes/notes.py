@@ -1,63 +1,86 @@
 from flask import Blueprint, request, jsonify
 from app.utils.auth import token_required
+from app.utils.versions import bump_version, versioned
+from app.utils.trade_cache import trade_cache
+from app.utils.changes import change_feed
+from app.utils.dates import date_filters
+from app.utils.export import EXPORT_FORMATS, export_response
+from app.utils.pagination import encode_cursor, parse_page_args, after
+from app.utils.serializers import NOTE_SCHEMA, NOTE_SUMMARY_SCHEMA
 from app.models.note import Note
 from app import db
-from datetime import datetime
 
 notes_bp = Blueprint('notes', __name__)
 
+EXPORT_CHUNK_SIZE = 1000
+
 @notes_bp.route('/', methods=['POST'])
 @token_required
 def create_note(current_user):
     data = request.get_json()
     new_note = Note(title=data['title'], content=data['content'], user_id=current_user.id)
     db.session.add(new_note)
+    db.session.flush()
+    # Read before the commit expires the object, which would reload it
+    note_id = new_note.id
+    bump_version(current_user.id)
     db.session.commit()
-    return jsonify({'message': 'Note created!'}), 201
+    trade_cache().apply(current_user.id)
+    change_feed().publish(current_user.id, 'note', note_id, 'create')
+    return jsonify({'message': 'Note created!', 'id': note_id}), 201
 
 @notes_bp.route('/', methods=['GET'])
 @token_required
+@versioned
 def get_notes(current_user):
-    date_str = request.args.get('date')
-    month_str = request.args.get('month')
-    query = Note.query.filter_by(user_id=current_user.id)
+    try:
+        fields = NOTE_SUMMARY_SCHEMA.parse_fields(request.args.get('fields'))
+        query = Note.query.filter(Note.user_id == current_user.id, *date_filters(Note.created_at, request.args))
+        limit, cursor = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
-    if date_str:
-        try:
-            note_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            query = query.filter(db.func.date(Note.created_at) == note_date)
-        except ValueError:
-            return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD.'}), 400
-    elif month_str:
-        try:
-            note_month = datetime.strptime(month_str, '%Y-%m')
-            query = query.filter(db.func.year(Note.created_at) == note_month.year, db.func.month(Note.created_at) == note_month.month)
-        except ValueError:
-            return jsonify({'message': 'Invalid month format. Use YYYY-MM.'}), 400
+    # created_at is needed for the cursor even when it isn't returned
+    query = query.options(NOTE_SUMMARY_SCHEMA.load_only(fields, Note.created_at))
+    if cursor:
+        query = query.filter(after(Note.created_at, Note.id, cursor))
+    query = query.order_by(Note.created_at.asc(), Note.id.asc())
+    next_cursor = None
+    if limit is not None:
+        notes = query.limit(limit + 1).all()
+        if len(notes) > limit:
+            notes = notes[:limit]
+            next_cursor = encode_cursor(notes[-1].created_at, notes[-1].id)
+    else:
+        notes = query.all()
+    return jsonify({'notes': NOTE_SUMMARY_SCHEMA.dump_many(notes, fields), 'next_cursor': next_cursor})
 
-    notes = query.order_by(Note.created_at.asc()).all()
-    output = []
-    for note in notes:
-        note_data = {}
-        note_data['id'] = note.id
-        note_data['title'] = note.title
-        note_data['content'] = note.content
-        note_data['created_at'] = note.created_at.isoformat() + 'Z'
-        output.append(note_data)
-    return jsonify({'notes': output})
+@notes_bp.route('/export', methods=['GET'])
+@token_required
+def export_notes(current_user):
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': 'Unsupported export format. Use format=csv or format=ndjson.'}), 400
+    columns = [Note.id, Note.title, Note.content, Note.created_at]
+    try:
+        query = db.session.query(*columns).filter(Note.user_id == current_user.id, *date_filters(Note.created_at, request.args))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    rows = query.order_by(Note.created_at.asc(), Note.id.asc()).yield_per(EXPORT_CHUNK_SIZE)
+    return export_response(rows, [column.key for column in columns], fmt, 'notes')
 
 @notes_bp.route('/<int:note_id>', methods=['GET'])
 @token_required
+@versioned
 def get_note(current_user, note_id):
-    note = Note.query.filter_by(id=note_id, user_id=current_user.id).first()
+    try:
+        fields = NOTE_SCHEMA.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    note = Note.query.options(NOTE_SCHEMA.load_only(fields)).filter_by(id=note_id, user_id=current_user.id).first()
     if not note:
         return jsonify({'message': 'No note found!'}), 404
-    note_data = {}
-    note_data['id'] = note.id
-    note_data['title'] = note.title
-    note_data['content'] = note.content
-    note_data['created_at'] = note.created_at.isoformat() + 'Z'
-    return jsonify(note_data)
+    return jsonify(NOTE_SCHEMA.dump(note, fields))
 
 @notes_bp.route('/<int:note_id>', methods=['PUT'])
 @token_required
@@ -68,7 +91,10 @@ def update_note(current_user, note_id):
     data = request.get_json()
     note.title = data.get('title', note.title)
     note.content = data.get('content', note.content)
+    bump_version(current_user.id)
     db.session.commit()
+    trade_cache().apply(current_user.id)
+    change_feed().publish(current_user.id, 'note', note_id, 'update')
     return jsonify({'message': 'Note updated!'})
 
 @notes_bp.route('/<int:note_id>', methods=['DELETE'])
@@ -78,5 +104,8 @@ def delete_note(current_user, note_id):
     if not note:
         return jsonify({'message': 'No note found!'}), 404
     db.session.delete(note)
+    bump_version(current_user.id)
     db.session.commit()
+    trade_cache().apply(current_user.id)
+    change_feed().publish(current_user.id, 'note', note_id, 'delete')
     return jsonify({'message': 'Note deleted!'})
\ No newline at end of file
@@ -1,6 +1,14 @@
 from flask import Blueprint, request, jsonify
 from app.utils.auth import token_required
+from app.utils.versions import bump_version, versioned
+from app.utils.trade_cache import trade_cache
+from app.utils.changes import change_feed
 from app.models.playbook import Playbook
+from app.models.trade import Trade
+from app.models.label import PlaybookLabel
+from app.utils.labels import PLAYBOOK_LABEL_KINDS, sync_playbook_labels, delete_playbook_labels
+from app.utils.serializers import PLAYBOOK_SCHEMA, PLAYBOOK_SUMMARY_FIELDS
+from app.utils import playbook_stats
 from app import db
 import uuid
 
@@ -27,49 +35,55 @@ def create_playbook(current_user):
         user_id=current_user.id
     )
     db.session.add(new_playbook)
+    db.session.flush()
+    sync_playbook_labels(new_playbook)
+    bump_version(current_user.id)
     db.session.commit()
+    trade_cache().apply(current_user.id)
+    change_feed().publish(current_user.id, 'playbook', playbook_id, 'create')
     return jsonify({'message': 'Playbook created!', 'playbook_id': playbook_id}), 201
 
 @playbooks_bp.route('/', methods=['GET'])
 @token_required
+@versioned
 def get_playbooks(current_user):
-    playbooks = Playbook.query.filter_by(user_id=current_user.id).all()
-    output = []
-    for playbook in playbooks:
-        playbook_data = {
-            'playbook_id': playbook.playbook_id,
-            'title': playbook.title,
-            'entry_model': playbook.entry_model,
-            'trade_model': playbook.trade_model,
-            'setup_grade': playbook.setup_grade,
-            'created_at': playbook.created_at.isoformat() + 'Z',
-            'updated_at': playbook.updated_at.isoformat() + 'Z'
-        }
-        output.append(playbook_data)
+    try:
+        fields = PLAYBOOK_SCHEMA.parse_fields(request.args.get('fields')) if request.args.get('fields') else PLAYBOOK_SUMMARY_FIELDS
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    query = Playbook.query.options(PLAYBOOK_SCHEMA.load_only(fields, Playbook.id)).filter_by(user_id=current_user.id)
+    for kind in PLAYBOOK_LABEL_KINDS:
+        if request.args.get(kind):
+            query = query.filter(Playbook.id.in_(
+                db.select(PlaybookLabel.playbook_id).where(PlaybookLabel.user_id == current_user.id,
+                                                           PlaybookLabel.kind == kind,
+                                                           PlaybookLabel.label == request.args[kind])
+            ))
+    playbooks = query.all()
+    output = PLAYBOOK_SCHEMA.dump_many(playbooks, fields)
+    # Cached aggregates for the whole page, fetched (or computed) in one go
+    ids = [playbook.id for playbook in playbooks]
+    stats = playbook_stats.get_stats(ids)
+    for item, row_id in zip(output, ids):
+        item['stats'] = stats[row_id]
     return jsonify({'playbooks': output})
 
 @playbooks_bp.route('/<playbook_id>', methods=['GET'])
 @token_required
+@versioned
 def get_playbook(current_user, playbook_id):
-    playbook = Playbook.query.filter_by(playbook_id=playbook_id, user_id=current_user.id).first()
+    try:
+        fields = PLAYBOOK_SCHEMA.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    playbook = Playbook.query.options(PLAYBOOK_SCHEMA.load_only(fields, Playbook.id)) \
+        .filter_by(playbook_id=playbook_id, user_id=current_user.id).first()
     if not playbook:
         return jsonify({'message': 'No playbook found!'}), 404
-    playbook_data = {
-        'playbook_id': playbook.playbook_id,
-        'title': playbook.title,
-        'entry_model': playbook.entry_model,
-        'trade_model': playbook.trade_model,
-        'setup_grade': playbook.setup_grade,
-        'confluences': playbook.confluences,
-        'rules': playbook.rules,
-        'confirmations': playbook.confirmations,
-        'invalidations': playbook.invalidations,
-        'roadmap': playbook.roadmap,
-        'tags': playbook.tags,
-        'created_at': playbook.created_at.isoformat() + 'Z',
-        'updated_at': playbook.updated_at.isoformat() + 'Z'
-    }
-    return jsonify(playbook_data)
+    output = PLAYBOOK_SCHEMA.dump(playbook, fields)
+    row_id = playbook.id
+    output['stats'] = playbook_stats.get_stats([row_id])[row_id]
+    return jsonify(output)
 
 @playbooks_bp.route('/<playbook_id>', methods=['PUT'])
 @token_required
@@ -89,8 +103,15 @@ def update_playbook(current_user, playbook_id):
     playbook.invalidations = data.get('invalidations', playbook.invalidations)
     playbook.roadmap = data.get('roadmap', playbook.roadmap)
     playbook.tags = data.get('tags', playbook.tags)
+    if 'confluences' in data or 'tags' in data:
+        sync_playbook_labels(playbook)
+    if 'entry_model' in data or 'trade_model' in data:
+        playbook_stats.invalidate_playbooks([playbook.id])
 
+    bump_version(current_user.id)
     db.session.commit()
+    trade_cache().apply(current_user.id)
+    change_feed().publish(current_user.id, 'playbook', playbook_id, 'update')
     return jsonify({'message': 'Playbook updated!'})
 
 @playbooks_bp.route('/<playbook_id>', methods=['DELETE'])
@@ -99,6 +120,21 @@ def delete_playbook(current_user, playbook_id):
     playbook = Playbook.query.filter_by(playbook_id=playbook_id, user_id=current_user.id).first()
     if not playbook:
         return jsonify({'message': 'No playbook found!'}), 404
+    delete_playbook_labels(playbook.id)
+    # Unlinked trades fall back to matching by model, possibly onto other playbooks
+    unlinked = db.session.execute(
+        db.update(Trade).where(Trade.user_id == current_user.id, Trade.playbook_id == playbook.playbook_id)
+        .values(playbook_id=None)
+    ).rowcount
+    if unlinked:
+        playbook_stats.invalidate_user(current_user.id)
+    else:
+        playbook_stats.invalidate_playbooks([playbook.id])
     db.session.delete(playbook)
+    bump_version(current_user.id)
     db.session.commit()
+    if not unlinked:
+        # Otherwise cached trades still name the playbook; the cache reloads them on the next read
+        trade_cache().apply(current_user.id)
+    change_feed().publish(current_user.id, 'playbook', playbook_id, 'delete')
     return jsonify({'message': 'Playbook deleted!'})
@@ -0,0 +1,53 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from app.utils.auth import token_required
+from app.utils.versions import versioned
+from app.utils.search import SEARCH_TYPES, search
+
+search_bp = Blueprint('search', __name__)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+MAX_QUERY_LENGTH = 256
+
+@search_bp.route('/', methods=['GET'])
+@token_required
+@versioned
+def search_journal(current_user):
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'message': 'Query parameter q is required.'}), 400
+    if len(query) > MAX_QUERY_LENGTH:
+        return jsonify({'message': f'Query must be at most {MAX_QUERY_LENGTH} characters.'}), 400
+
+    types = SEARCH_TYPES
+    if request.args.get('type'):
+        types = tuple(request.args['type'].split(','))
+        if not set(types) <= set(SEARCH_TYPES):
+            return jsonify({'message': 'type must be note, trade or both.'}), 400
+
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    offset = request.args.get('offset', 0, type=int)
+    if limit < 1 or offset < 0:
+        return jsonify({'message': 'limit must be positive and offset non-negative.'}), 400
+    limit = min(limit, MAX_PAGE_SIZE)
+
+    hits = search(current_user.id, query, types, limit + 1, offset)
+    next_offset = None
+    if len(hits) > limit:
+        hits = hits[:limit]
+        next_offset = offset + limit
+
+    output = []
+    for hit in hits:
+        timestamp = hit['timestamp']
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        output.append({
+            'type': hit['type'],
+            'id': hit['id'],
+            'title': hit['title'],
+            'snippet': hit['snippet'],
+            'timestamp': timestamp.isoformat() + 'Z' if timestamp else None,
+        })
+    return jsonify({'results': output, 'next_offset': next_offset})
@@ -0,0 +1,13 @@
+from flask import Blueprint, jsonify
+from app.utils.auth import token_required, auth_cache_stats
+from app.utils.passwords import password_hasher
+from app.utils.trade_cache import trade_cache
+from app.utils.changes import change_feed
+
+system_bp = Blueprint('system', __name__)
+
+@system_bp.route('/caches', methods=['GET'])
+@token_required
+def get_cache_stats(current_user):
+    return jsonify({'auth': auth_cache_stats(), 'password_hashing': password_hasher().stats(),
+                    'trades': trade_cache().stats(), 'event_streams': change_feed().stats()})
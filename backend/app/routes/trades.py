@@ -1,130 +1,433 @@
-from flask import Blueprint, request, jsonify, current_app, send_from_directory
+from flask import Blueprint, request, jsonify, current_app, send_file
 from sqlalchemy import extract
+from sqlalchemy.exc import SQLAlchemyError
 from app.utils.auth import token_required
+from app.utils.versions import bump_version, versioned
+from app.utils.dates import date_filters, month_bounds, parse_range_args
+from app.utils.export import EXPORT_FORMATS, export_response
+from app.utils.pagination import encode_cursor, parse_page_args, after
 from app.models.trade import Trade
+from app.models.note import Note
+from app.models.rollup import DailyPnl, MonthlyPnl
+from app.models.label import TradeConfluence
+from app.models.playbook import Playbook
+from app.utils import analytics, labels, playbook_stats, rollups, search
+from app.utils.trade_cache import trade_cache, trade_row
+from app.utils.changes import change_feed
+from app.utils.importer import StreamError, detect_format, iter_rows
+from app.utils.serializers import TRADE_SCHEMA
+from app.utils.thumbnails import RENDITIONS, rendition_path
+from app.utils.screenshots import (save_screenshot, release_screenshot, delete_screenshot_files,
+                                   screenshot_path, storage_key, is_content_addressed)
 from app import db
 from datetime import datetime
 import os
-from werkzeug.utils import secure_filename
+import mimetypes
 import json
 
 trades_bp = Blueprint('trades', __name__)
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
+SCREENSHOT_MAX_AGE = 365 * 24 * 60 * 60
+MAX_IMPORT_BATCH_SIZE = 10000
+MAX_IMPORT_ERRORS = 1000
+EXPORT_CHUNK_SIZE = 1000
+FILTER_FIELDS = ('result', 'result_type', 'ticker', 'setup_type', 'playbook_id')
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
+def filter_trades(query, user_id, args):
+    """Apply the filters shared by the list and export endpoints. Raises ValueError."""
+    query = query.filter(Trade.user_id == user_id, *date_filters(Trade.entry_datetime, args))
+    for field in FILTER_FIELDS:
+        if args.get(field):
+            query = query.filter(getattr(Trade, field) == args[field])
+    if args.get('confluence'):
+        query = query.filter(Trade.id.in_(
+            db.select(TradeConfluence.trade_id).where(TradeConfluence.user_id == user_id,
+                                                      TradeConfluence.label == args['confluence'])
+        ))
+    return query
+
+def required_text(data, name):
+    # Imported rows can carry null (NDJSON) or missing (short CSV rows) values
+    value = data[name]
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f'{name} must be a non-empty string')
+    return value
+
+def parse_confluences(value):
+    if isinstance(value, str):
+        value = json.loads(value)
+    if not isinstance(value, list) or not all(isinstance(label, str) for label in value):
+        raise ValueError('confluences must be a list of strings')
+    return value
+
+def parse_trade_fields(data):
+    """Convert submitted trade fields to column values. Raises KeyError, ValueError or TypeError."""
+    return {
+        'ticker': required_text(data, 'ticker'),
+        'result': required_text(data, 'result'),
+        'total_pnl': float(data['total_pnl']),
+        'entry_datetime': datetime.fromisoformat(data['entry_datetime'].replace('Z', '+00:00')),
+        'exit_datetime': datetime.fromisoformat(data['exit_datetime'].replace('Z', '+00:00')),
+        'risk_reward': float(data['risk_reward']),
+        'position': required_text(data, 'position'),
+        'stoploss_pips': int(data['stoploss_pips']),
+        # Form posts use `range`; exported rows carry the column name `trade_range`
+        'trade_range': int(data['range'] if 'range' in data else data['trade_range']),
+        'result_type': required_text(data, 'result_type'),
+        'entry_model': required_text(data, 'entry_model'),
+        'trade_model': required_text(data, 'trade_model'),
+        'setup_type': required_text(data, 'setup_type'),
+        'confluences': parse_confluences(data['confluences']),
+        'trade_note': data.get('trade_note'),
+        'roadmap': data.get('roadmap'),
+        'playbook_id': data.get('playbook_id') or None
+    }
+
+def owned_playbook_ids(user_id):
+    return set(db.session.scalars(db.select(Playbook.playbook_id).where(Playbook.user_id == user_id)))
+
+def playbook_exists(user_id, playbook_id):
+    return db.session.query(
+        Playbook.query.filter_by(playbook_id=playbook_id, user_id=user_id).exists()
+    ).scalar()
+
+def field_error_message(e):
+    if isinstance(e, KeyError):
+        return f'Missing field: {e.args[0]}'
+    return f'Invalid value: {e}'
+
 @trades_bp.route('/', methods=['POST'])
 @token_required
 def create_trade(current_user):
     data = request.form
+    try:
+        fields = parse_trade_fields(data)
+    except (KeyError, ValueError, TypeError, AttributeError) as e:
+        return jsonify({'message': field_error_message(e)}), 400
+    if fields['playbook_id'] and not playbook_exists(current_user.id, fields['playbook_id']):
+        return jsonify({'message': 'No playbook found!'}), 400
+
     filename = None
     if 'screenshot' in request.files:
         file = request.files['screenshot']
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
-
-    new_trade = Trade(
-        ticker=data['ticker'],
-        result=data['result'],
-        total_pnl=float(data['total_pnl']),
-        entry_datetime=datetime.fromisoformat(data['entry_datetime'].replace('Z', '+00:00')),
-        exit_datetime=datetime.fromisoformat(data['exit_datetime'].replace('Z', '+00:00')),
-        risk_reward=float(data['risk_reward']),
-        position=data['position'],
-        stoploss_pips=int(data['stoploss_pips']),
-        trade_range=int(data['range']),
-        result_type=data['result_type'],
-        entry_model=data['entry_model'],
-        trade_model=data['trade_model'],
-        setup_type=data['setup_type'],
-        confluences=json.loads(data['confluences']),
-        trade_note=data.get('trade_note'),
-        roadmap=data.get('roadmap'),
-        screenshot_filename=filename,
-        user_id=current_user.id
-    )
+            filename = save_screenshot(file, file.filename.rsplit('.', 1)[1].lower())
+
+    new_trade = Trade(**fields, screenshot_filename=filename, user_id=current_user.id)
     db.session.add(new_trade)
+    db.session.flush()
+    labels.sync_trade_confluences(new_trade)
+    rollups.record_change(new=rollups.snapshot(new_trade))
+    playbook_stats.invalidate(current_user.id, [playbook_stats.snapshot(new_trade)])
+    bump_version(current_user.id)
+    row, trade_id = trade_row(new_trade), new_trade.id
     db.session.commit()
+    trade_cache().apply(current_user.id, upserts=[row])
+    change_feed().publish(current_user.id, 'trade', trade_id, 'create')
     return jsonify({'message': 'Trade created!'}), 201
 
-@trades_bp.route('/', methods=['GET'])
+@trades_bp.route('/import', methods=['POST'])
 @token_required
-def get_trades(current_user):
-    date_str = request.args.get('date')
-    month_str = request.args.get('month')
-    query = Trade.query.filter_by(user_id=current_user.id)
+def import_trades(current_user):
+    fmt = detect_format(request.args.get('format'), request.content_type)
+    if not fmt:
+        return jsonify({'message': 'Unsupported import format. Use format=csv or format=ndjson.'}), 400
+    batch_size = request.args.get('batch_size', current_app.config['IMPORT_BATCH_SIZE'], type=int)
+    batch_size = max(1, min(batch_size, MAX_IMPORT_BATCH_SIZE))
 
-    if date_str:
+    imported, failed, errors = 0, 0, []
+    batch, batch_rows = [], []
+    playbook_ids = owned_playbook_ids(current_user.id)
+
+    def add_error(row_number, message, always=False):
+        if always or len(errors) < MAX_IMPORT_ERRORS:
+            errors.append({'row': row_number, 'message': message})
+
+    def flush():
+        nonlocal imported, failed
         try:
-            trade_date = datetime.strptime(date_str, '%Y-%m-%d').date()
-            query = query.filter(db.func.date(Trade.entry_datetime) == trade_date)
-        except ValueError:
-            return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD.'}), 400
-    elif month_str:
+            insert_batch()
+            imported += len(batch)
+        except SQLAlchemyError as e:
+            # The batch is rolled back as a whole; earlier batches stay imported
+            db.session.rollback()
+            current_app.logger.warning('Import batch failed: %s', e)
+            failed += len(batch)
+            for row_number in batch_rows:
+                add_error(row_number, 'Database error: the rows in this batch were not imported')
+        batch.clear()
+        batch_rows.clear()
+
+    def insert_batch():
+        # One executemany per batch, plus the matching confluence rows, search
+        # index entries and rollup deltas, in one transaction
+        search.defer_indexing('trade')
+        trade_ids = db.session.execute(
+            Trade.__table__.insert().returning(Trade.id, sort_by_parameter_order=True), batch
+        ).scalars().all()
+        search.index_rows('trade', trade_ids)
+        labels.insert_rows(TradeConfluence, [
+            label_row
+            for trade_id, row in zip(trade_ids, batch)
+            for label_row in labels.trade_confluence_rows(current_user.id, trade_id, row['confluences'])
+        ])
+        rollups.apply_changes((rollups.TradeSnapshot(current_user.id, row['entry_datetime'], row['result'], row['total_pnl']), 1) for row in batch)
+        playbook_stats.invalidate(current_user.id, (
+            playbook_stats.AttributionSnapshot(row['playbook_id'], row['entry_model'], row['trade_model']) for row in batch
+        ))
+        bump_version(current_user.id)
+        db.session.commit()
+
+    for row_number, row in iter_rows(request.stream, fmt):
+        if isinstance(row, StreamError):
+            # Keep the rows parsed so far and report where reading stopped
+            failed += 1
+            add_error(row_number, str(row), always=True)
+            break
         try:
-            trade_month = datetime.strptime(month_str, '%Y-%m')
-            query = query.filter(extract('year', Trade.entry_datetime) == trade_month.year, extract('month', Trade.entry_datetime) == trade_month.month)
-        except ValueError:
-            return jsonify({'message': 'Invalid month format. Use YYYY-MM.'}), 400
+            if isinstance(row, Exception):
+                raise row
+            fields = parse_trade_fields(row)
+            if fields['playbook_id'] and fields['playbook_id'] not in playbook_ids:
+                raise ValueError(f"unknown playbook_id {fields['playbook_id']}")
+        except (KeyError, ValueError, TypeError, AttributeError) as e:
+            failed += 1
+            add_error(row_number, field_error_message(e))
+            continue
+        fields['trade_note'] = fields['trade_note'] or None
+        fields['roadmap'] = fields['roadmap'] or None
+        batch.append(dict(fields, screenshot_filename=None, user_id=current_user.id))
+        batch_rows.append(row_number)
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    if imported:
+        change_feed().publish(current_user.id, 'trade', None, 'import')
+
+    return jsonify({
+        'message': 'Import finished!',
+        'imported': imported,
+        'failed': failed,
+        'errors': errors,
+        'errors_truncated': failed > len(errors)
+    })
+
+@trades_bp.route('/', methods=['GET'])
+@token_required
+@versioned
+def get_trades(current_user):
+    columns = trade_cache().lookup(current_user.id)
+    try:
+        fields = TRADE_SCHEMA.parse_fields(request.args.get('fields'))
+        if columns is not None:
+            rows = columns.select(request.args, FILTER_FIELDS)
+        else:
+            query = filter_trades(Trade.query, current_user.id, request.args)
+        # Pagination is opt-in so existing callers that expect the full list keep working
+        limit, cursor = parse_page_args(request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
 
+    next_cursor = None
+    if columns is not None:
+        if cursor:
+            rows = columns.after(rows, *cursor)
+        if limit is not None and len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(*columns.key(rows[-1]))
+        return jsonify({'trades': columns.dump(rows, fields), 'next_cursor': next_cursor})
+
+    # entry_datetime is needed for the cursor even when it isn't returned
+    query = query.options(TRADE_SCHEMA.load_only(fields, Trade.entry_datetime))
+    if cursor:
+        query = query.filter(after(Trade.entry_datetime, Trade.id, cursor))
+    query = query.order_by(Trade.entry_datetime.asc(), Trade.id.asc())
+    if limit is not None:
+        trades = query.limit(limit + 1).all()
+        if len(trades) > limit:
+            trades = trades[:limit]
+            next_cursor = encode_cursor(trades[-1].entry_datetime, trades[-1].id)
+    else:
+        trades = query.all()
+
+    return jsonify({'trades': TRADE_SCHEMA.dump_many(trades, fields), 'next_cursor': next_cursor})
+
+@trades_bp.route('/export', methods=['GET'])
+@token_required
+def export_trades(current_user):
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': 'Unsupported export format. Use format=csv or format=ndjson.'}), 400
+    columns = [column for column in Trade.__table__.columns if column.name != 'user_id']
+    try:
+        query = filter_trades(db.session.query(*columns), current_user.id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    rows = query.order_by(Trade.entry_datetime.asc(), Trade.id.asc()).yield_per(EXPORT_CHUNK_SIZE)
+    return export_response(rows, [column.name for column in columns], fmt, 'trades')
+
+@trades_bp.route('/stats', methods=['GET'])
+@token_required
+@versioned
+def get_trade_stats(current_user):
+    try:
+        start, end = parse_range_args(request.args)
+    except ValueError:
+        return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+
+    # Read from the daily/monthly rollups so the cost scales with days, not trades
+    filters = [DailyPnl.user_id == current_user.id]
+    if start:
+        filters.append(DailyPnl.day >= start.date())
+    if end:
+        filters.append(DailyPnl.day < end.date())
+
+    totals = db.session.query(
+        db.func.coalesce(db.func.sum(DailyPnl.trade_count), 0),
+        db.func.coalesce(db.func.sum(DailyPnl.net_pnl), 0.0),
+        db.func.coalesce(db.func.sum(DailyPnl.gross_profit), 0.0),
+        db.func.coalesce(db.func.sum(DailyPnl.gross_loss), 0.0),
+        db.func.coalesce(db.func.sum(DailyPnl.wins), 0),
+        db.func.coalesce(db.func.sum(DailyPnl.losses), 0)
+    ).filter(*filters).one()
+    total_trades, net_pnl, gross_profit, gross_loss, wins, losses = totals
+
+    if start or end:
+        year = extract('year', DailyPnl.day)
+        month = extract('month', DailyPnl.day)
+        monthly_rows = db.session.query(year, month, db.func.sum(DailyPnl.trade_count), db.func.sum(DailyPnl.net_pnl)) \
+            .filter(*filters).group_by(year, month).order_by(year, month).all()
+    else:
+        monthly_rows = [
+            (row.month.year, row.month.month, row.trade_count, row.net_pnl)
+            for row in MonthlyPnl.query.filter_by(user_id=current_user.id).order_by(MonthlyPnl.month.asc())
+        ]
+
+    average_win = gross_profit / wins if wins else 0.0
+    average_loss = gross_loss / losses if losses else 0.0
+    stats = {
+        'total_trades': total_trades,
+        'wins': wins,
+        'losses': losses,
+        'win_rate': round(wins / total_trades * 100, 2) if total_trades else 0.0,
+        'net_pnl': net_pnl,
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'profit_factor': round(gross_profit / gross_loss, 2) if gross_loss else None,
+        'average_win': average_win,
+        'average_loss': average_loss,
+        'avg_win_loss_ratio': round(average_win / average_loss, 2) if average_loss else None,
+        'monthly': [
+            {'month': f'{int(y):04d}-{int(m):02d}', 'trades': count, 'pnl': pnl}
+            for y, m, count, pnl in monthly_rows
+        ]
+    }
+    return jsonify(stats)
+
+@trades_bp.route('/calendar', methods=['GET'])
+@token_required
+@versioned
+def get_trade_calendar(current_user):
+    try:
+        month_start, month_end = month_bounds(request.args.get('month', ''))
+    except ValueError:
+        return jsonify({'message': 'Invalid month format. Use YYYY-MM.'}), 400
+
+    # Trade days come from the daily rollup and note days from the (user_id, created_at)
+    # index, merged into one row per day by a single grouped query
+    note_day = db.func.date(Note.created_at)
+    days = db.union_all(
+        db.select(DailyPnl.day.label('day'), DailyPnl.trade_count.label('trades'), DailyPnl.wins.label('wins'),
+                  DailyPnl.losses.label('losses'), DailyPnl.net_pnl.label('net_pnl'), db.literal(0).label('notes'))
+        .where(DailyPnl.user_id == current_user.id, DailyPnl.day >= month_start.date(),
+               DailyPnl.day < month_end.date()),
+        db.select(note_day, db.literal(0), db.literal(0), db.literal(0), db.literal(0.0), db.func.count())
+        .where(Note.user_id == current_user.id, Note.created_at >= month_start, Note.created_at < month_end)
+        .group_by(note_day)
+    ).subquery()
+    rows = db.session.execute(
+        db.select(days.c.day, db.func.sum(days.c.trades), db.func.sum(days.c.wins), db.func.sum(days.c.losses),
+                  db.func.sum(days.c.net_pnl), db.func.sum(days.c.notes))
+        .group_by(days.c.day).order_by(days.c.day)
+    ).all()
+    return jsonify({
+        'month': month_start.strftime('%Y-%m'),
+        'days': [
+            {'date': str(day), 'trades': int(count), 'wins': int(wins), 'losses': int(losses),
+             'net_pnl': float(pnl), 'has_note': bool(notes)}
+            for day, count, wins, losses, pnl, notes in rows
+        ]
+    })
+
+@trades_bp.route('/stats/confluences', methods=['GET'])
+@token_required
+@versioned
+def get_confluence_stats(current_user):
+    try:
+        filters = date_filters(Trade.entry_datetime, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # One pass over the (user_id, label, trade_id) index joined to the trades
+    trade_count = db.func.count(Trade.id)
+    wins = db.func.sum(db.case((Trade.result == 'Win', 1), else_=0))
+    losses = db.func.sum(db.case((Trade.result == 'Loss', 1), else_=0))
+    rows = db.session.query(
+        TradeConfluence.label, trade_count, wins, losses,
+        db.func.avg(analytics.r_multiple_sql(Trade.result, Trade.risk_reward)), db.func.sum(Trade.total_pnl)
+    ).join(Trade, Trade.id == TradeConfluence.trade_id) \
+        .filter(TradeConfluence.user_id == current_user.id, *filters) \
+        .group_by(TradeConfluence.label) \
+        .order_by(trade_count.desc(), TradeConfluence.label.asc()).all()
 
-    trades = query.order_by(Trade.entry_datetime.asc()).all()
     output = []
-    for trade in trades:
-        trade_data = {
-            'id': trade.id,
-            'ticker': trade.ticker,
-            'result': trade.result,
-            'total_pnl': trade.total_pnl,
-            'entry_datetime': trade.entry_datetime.isoformat() + 'Z',
-            'exit_datetime': trade.exit_datetime.isoformat() + 'Z',
-            'risk_reward': trade.risk_reward,
-            'position': trade.position,
-            'stoploss_pips': trade.stoploss_pips,
-            'trade_range': trade.trade_range,
-            'result_type': trade.result_type,
-            'entry_model': trade.entry_model,
-            'trade_model': trade.trade_model,
-            'setup_type': trade.setup_type,
-            'confluences': trade.confluences,
-            'trade_note': trade.trade_note,
-            'roadmap': trade.roadmap,
-            'screenshot_filename': trade.screenshot_filename
-        }
-        output.append(trade_data)
-    return jsonify({'trades': output})
+    for label, count, label_wins, label_losses, average_r, net_pnl in rows:
+        output.append({
+            'label': label,
+            'trades': count,
+            'wins': label_wins,
+            'losses': label_losses,
+            'win_rate': round(label_wins / count * 100, 2),
+            'average_r': round(average_r, 2),
+            'net_pnl': net_pnl,
+            'expectancy': net_pnl / count
+        })
+    return jsonify({'confluences': output})
+
+@trades_bp.route('/analytics', methods=['GET'])
+@token_required
+@versioned
+def get_trade_analytics(current_user):
+    if not analytics.available():
+        return jsonify({'message': 'Analytics require NumPy on the server.'}), 501
+    columns = trade_cache().lookup(current_user.id, analytics=True)
+    try:
+        if columns is not None and columns.can_select(request.args, FILTER_FIELDS):
+            arrays = analytics.cached_columns(columns, columns.select(request.args, FILTER_FIELDS))
+        else:
+            arrays = analytics.load_columns(filter_trades(Trade.query, current_user.id, request.args))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    return jsonify(analytics.compute_analytics(*arrays))
 
 @trades_bp.route('/<int:trade_id>', methods=['GET'])
 @token_required
+@versioned
 def get_trade(current_user, trade_id):
-    trade = Trade.query.filter_by(id=trade_id, user_id=current_user.id).first()
+    try:
+        fields = TRADE_SCHEMA.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    trade = Trade.query.options(TRADE_SCHEMA.load_only(fields)).filter_by(id=trade_id, user_id=current_user.id).first()
     if not trade:
         return jsonify({'message': 'No trade found!'}), 404
-    trade_data = {
-        'id': trade.id,
-        'ticker': trade.ticker,
-        'result': trade.result,
-        'total_pnl': trade.total_pnl,
-        'entry_datetime': trade.entry_datetime.isoformat() + 'Z',
-        'exit_datetime': trade.exit_datetime.isoformat() + 'Z',
-        'risk_reward': trade.risk_reward,
-        'position': trade.position,
-        'stoploss_pips': trade.stoploss_pips,
-        'trade_range': trade.trade_range,
-        'result_type': trade.result_type,
-        'entry_model': trade.entry_model,
-        'trade_model': trade.trade_model,
-        'setup_type': trade.setup_type,
-        'confluences': trade.confluences,
-        'trade_note': trade.trade_note,
-        'roadmap': trade.roadmap,
-        'screenshot_filename': trade.screenshot_filename
-    }
-    return jsonify(trade_data)
+    return jsonify(TRADE_SCHEMA.dump(trade, fields))
 
 @trades_bp.route('/<int:trade_id>', methods=['PUT'])
 @token_required
@@ -133,7 +436,11 @@ def update_trade(current_user, trade_id):
     if not trade:
         return jsonify({'message': 'No trade found!'}), 404
     data = request.form
-    
+    if data.get('playbook_id') and not playbook_exists(current_user.id, data['playbook_id']):
+        return jsonify({'message': 'No playbook found!'}), 400
+    old_snapshot = rollups.snapshot(trade)
+    old_attribution = playbook_stats.snapshot(trade)
+
     trade.ticker = data.get('ticker', trade.ticker)
     trade.result = data.get('result', trade.result)
     trade.total_pnl = float(data.get('total_pnl', trade.total_pnl))
@@ -150,23 +457,31 @@ def update_trade(current_user, trade_id):
     trade.trade_model = data.get('trade_model', trade.trade_model)
     trade.setup_type = data.get('setup_type', trade.setup_type)
     if 'confluences' in data:
-        trade.confluences = json.loads(data['confluences'])
+        trade.confluences = parse_confluences(data['confluences'])
+        labels.sync_trade_confluences(trade)
     trade.trade_note = data.get('trade_note', trade.trade_note)
     trade.roadmap = data.get('roadmap', trade.roadmap)
+    if 'playbook_id' in data:
+        trade.playbook_id = data['playbook_id'] or None
 
+    orphaned = None
     if 'screenshot' in request.files:
         file = request.files['screenshot']
         if file and allowed_file(file.filename):
-            filename = secure_filename(file.filename)
-            if trade.screenshot_filename:
-                try:
-                    os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], trade.screenshot_filename))
-                except FileNotFoundError:
-                    pass # Ignore if file does not exist
-            file.save(os.path.join(current_app.config['UPLOAD_FOLDER'], filename))
+            filename = save_screenshot(file, file.filename.rsplit('.', 1)[1].lower())
+            if trade.screenshot_filename and release_screenshot(trade.screenshot_filename, trade.id):
+                orphaned = trade.screenshot_filename
             trade.screenshot_filename = filename
 
+    rollups.record_change(old=old_snapshot, new=rollups.snapshot(trade))
+    playbook_stats.invalidate(current_user.id, [old_attribution, playbook_stats.snapshot(trade)])
+    bump_version(current_user.id)
+    row = trade_row(trade)
     db.session.commit()
+    trade_cache().apply(current_user.id, upserts=[row])
+    change_feed().publish(current_user.id, 'trade', trade_id, 'update')
+    if orphaned and orphaned != trade.screenshot_filename:
+        delete_screenshot_files(orphaned)
     return jsonify({'message': 'Trade updated!'})
 
 @trades_bp.route('/<int:trade_id>', methods=['DELETE'])
@@ -175,19 +490,55 @@ def delete_trade(current_user, trade_id):
     trade = Trade.query.filter_by(id=trade_id, user_id=current_user.id).first()
     if not trade:
         return jsonify({'message': 'No trade found!'}), 404
-    if trade.screenshot_filename:
-        try:
-            os.remove(os.path.join(current_app.config['UPLOAD_FOLDER'], trade.screenshot_filename))
-        except FileNotFoundError:
-            pass # Ignore if file does not exist
+    orphaned = None
+    if trade.screenshot_filename and release_screenshot(trade.screenshot_filename, trade.id):
+        orphaned = trade.screenshot_filename
+    rollups.record_change(old=rollups.snapshot(trade))
+    playbook_stats.invalidate(current_user.id, [playbook_stats.snapshot(trade)])
+    labels.delete_trade_confluences(trade.id)
     db.session.delete(trade)
+    bump_version(current_user.id)
     db.session.commit()
+    trade_cache().apply(current_user.id, deleted=[trade_id])
+    change_feed().publish(current_user.id, 'trade', trade_id, 'delete')
+    if orphaned:
+        delete_screenshot_files(orphaned)
     return jsonify({'message': 'Trade deleted!'})
 
 @trades_bp.route('/screenshots/<path:filename>', methods=['GET'])
 @token_required
 def get_screenshot(current_user, filename):
-    trade = Trade.query.filter_by(screenshot_filename=filename, user_id=current_user.id).first()
-    if not trade:
+    # Served by the (user_id, screenshot_filename) index without loading the trade
+    owned = db.session.query(Trade.id).filter_by(user_id=current_user.id, screenshot_filename=filename).first()
+    if not owned:
         return jsonify({'message': 'Not authorized to access this screenshot or screenshot not found'}), 403
-    return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
\ No newline at end of file
+
+    size = request.args.get('size', 'original')
+    if size != 'original' and size not in RENDITIONS:
+        return jsonify({'message': f"Invalid size. Use one of: original, {', '.join(RENDITIONS)}."}), 400
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    path = screenshot_path(filename)
+    if not os.path.exists(path):
+        return jsonify({'message': 'Screenshot not found'}), 404
+    fallback = False
+    if size in RENDITIONS:
+        if os.path.exists(rendition_path(upload_folder, size, storage_key(filename))):
+            path = rendition_path(upload_folder, size, storage_key(filename))
+        else:
+            # Not rendered yet (or the queue was full at upload time): serve the original for now
+            current_app.extensions['renditions'].submit(path, upload_folder, storage_key(filename))
+            fallback = True
+
+    # ETag/Last-Modified come from the file, and a matching If-None-Match or
+    # If-Modified-Since is answered with 304 without sending the body
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    # The bytes behind a content-addressed name never change, so those can be cached for good,
+    # except for an original standing in for a rendition that will replace it
+    immutable = is_content_addressed(filename) and not fallback
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=True,
+                         max_age=SCREENSHOT_MAX_AGE if immutable else 0)
+    response.cache_control.public = None
+    response.cache_control.private = True
+    response.cache_control.immutable = immutable
+    response.cache_control.no_cache = fallback or None
+    return response
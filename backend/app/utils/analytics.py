@@ -0,0 +1,185 @@
+from app import db
+from app.models.trade import Trade
+
+try:
+    import numpy as np
+except ImportError:  # optional; GET /trades/analytics answers 501 without it
+    np = None
+
+SECONDS_PER_DAY = 24 * 60 * 60
+TRADING_DAYS_PER_YEAR = 252
+EQUITY_CURVE_POINTS = 500
+# R-multiple histogram: fixed-width bins, with everything outside folded into the edge bins
+R_BIN_WIDTH = 0.5
+R_MIN, R_MAX = -3.0, 5.0
+WEEKDAYS = ('Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday')
+WIN, LOSS = ord('W'), ord('L')
+
+def available():
+    return np is not None
+
+def load_columns(query):
+    """Load entry time, P&L, R:R and outcome of the trades in `query` as arrays.
+
+    Only these four columns are fetched, as plain rows, and NumPy builds one
+    typed array per column. Entry times come back as text, which NumPy parses
+    far faster than it converts datetime objects. Rows are sorted here rather
+    than in SQL so the query's own ordering does not matter.
+    """
+    outcome = db.case((Trade.result == 'Win', WIN), (Trade.result == 'Loss', LOSS), else_=ord('-'))
+    rows = query.with_entities(db.cast(Trade.entry_datetime, db.String), Trade.total_pnl, Trade.risk_reward,
+                               outcome.label('outcome')).order_by(None).all()
+    if not rows:
+        return (np.empty(0, dtype='datetime64[s]'), np.empty(0), np.empty(0), np.empty(0, dtype=np.uint8))
+
+    entered, pnl, risk_reward, outcomes = zip(*rows)
+    entered = np.array(entered, dtype='datetime64[s]')
+    order = np.argsort(entered, kind='stable')
+    return (entered[order],
+            np.fromiter(pnl, dtype=np.float64, count=len(rows))[order],
+            np.fromiter(risk_reward, dtype=np.float64, count=len(rows))[order],
+            np.fromiter(outcomes, dtype=np.uint8, count=len(rows))[order])
+
+def cached_columns(columns, rows):
+    """The arrays `load_columns` would return, taken from a TradeColumns snapshot instead."""
+    outcomes = np.full(len(rows), ord('-'), dtype=np.uint8)
+    outcomes[columns.equals('result', 'Win', rows)] = WIN
+    outcomes[columns.equals('result', 'Loss', rows)] = LOSS
+    return (columns.column('entry_datetime', rows).astype('datetime64[s]'), columns.column('total_pnl', rows),
+            columns.column('risk_reward', rows), outcomes)
+
+def ratio(numerator, denominator, digits=2):
+    return round(float(numerator) / float(denominator), digits) if denominator else None
+
+def runs(mask):
+    """Start and end (exclusive) indexes of every run of True values in `mask`."""
+    edges = np.diff(np.concatenate(([0], mask.view(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+
+def timestamp(value):
+    return str(np.datetime_as_string(value, unit='s'))
+
+def r_multiples(risk_reward, wins, losses):
+    """Realized R per trade: a win earns its R:R, a loss costs 1R and a breakeven is 0R.
+
+    `risk_reward` is the planned ratio and carries no sign, so the outcome supplies it.
+    """
+    return np.where(wins, np.abs(risk_reward), np.where(losses, -1.0, 0.0))
+
+def r_multiple_sql(result, risk_reward):
+    """The same rule as `r_multiples`, as a SQL expression over the given columns."""
+    return db.case((result == 'Win', db.func.abs(risk_reward)), (result == 'Loss', -1.0), else_=0.0)
+
+def summary(pnl, r_multiple, wins, losses):
+    count = len(pnl)
+    gross_profit = float(pnl[pnl > 0].sum())
+    gross_loss = float(np.abs(pnl[pnl < 0]).sum())
+    win_count, loss_count = int(wins.sum()), int(losses.sum())
+    average_win = float(pnl[wins].mean()) if win_count else 0.0
+    average_loss = float(-pnl[losses].mean()) if loss_count else 0.0
+    return {
+        'total_trades': count,
+        'wins': win_count,
+        'losses': loss_count,
+        'breakeven': count - win_count - loss_count,
+        'win_rate': round(win_count / count * 100, 2) if count else 0.0,
+        'net_pnl': float(pnl.sum()),
+        'gross_profit': gross_profit,
+        'gross_loss': gross_loss,
+        'profit_factor': ratio(gross_profit, gross_loss),
+        'average_win': average_win,
+        'average_loss': average_loss,
+        # Average result per trade, in money and in R
+        'expectancy': float(pnl.mean()) if count else 0.0,
+        'expectancy_r': round(float(r_multiple.mean()), 4) if count else 0.0,
+    }
+
+def drawdown(entered, equity):
+    # Equity starts at zero before the first trade, so a losing first trade is a drawdown too
+    equity = np.concatenate(([0.0], equity))
+    depth = np.maximum.accumulate(equity) - equity
+    trough = int(np.argmax(depth))
+    peak = int(np.argmax(equity[:trough + 1]))
+    return {
+        'max_drawdown': float(depth[trough]),
+        'max_drawdown_start': timestamp(entered[peak - 1]) if depth[trough] and peak else None,
+        'max_drawdown_end': timestamp(entered[trough - 1]) if depth[trough] else None,
+        'current_drawdown': float(depth[-1]),
+    }, depth[1:]
+
+def daily_ratios(days, pnl):
+    # Trades are sorted, so each day is a contiguous slice that reduceat can sum
+    starts = np.flatnonzero(np.concatenate(([True], days[1:] != days[:-1])))
+    daily = np.add.reduceat(pnl, starts) if len(pnl) else pnl
+    annualize = np.sqrt(TRADING_DAYS_PER_YEAR)
+    mean = daily.mean() if len(daily) else 0.0
+    deviation = daily.std(ddof=1) if len(daily) > 1 else 0.0
+    downside = np.sqrt(np.mean(np.minimum(daily, 0.0) ** 2)) if len(daily) else 0.0
+    return {
+        'trading_days': len(daily),
+        'average_daily_pnl': float(mean),
+        'sharpe_ratio': ratio(mean * annualize, deviation),
+        'sortino_ratio': ratio(mean * annualize, downside),
+    }
+
+def streaks(wins, losses):
+    """Longest and current runs of wins and losses; a breakeven trade ends either run."""
+    result = {'current_streak': {'type': None, 'length': 0}}
+    for name, mask in (('win', wins), ('loss', losses)):
+        starts, ends = runs(mask)
+        lengths = ends - starts
+        result[f'longest_{name}_streak'] = int(lengths.max()) if len(lengths) else 0
+        if len(ends) and ends[-1] == len(mask):
+            result['current_streak'] = {'type': name, 'length': int(lengths[-1])}
+    return result
+
+def r_distribution(r_multiple):
+    edges = np.arange(R_MIN, R_MAX + R_BIN_WIDTH / 2, R_BIN_WIDTH)
+    bins = len(edges) - 1
+    index = np.clip(np.floor((r_multiple - R_MIN) / R_BIN_WIDTH).astype(np.int64), 0, bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    return [{'from': float(edges[i]), 'to': float(edges[i + 1]), 'trades': int(counts[i])} for i in range(bins)]
+
+def breakdown(keys, size, pnl, wins):
+    counts = np.bincount(keys, minlength=size)
+    won = np.bincount(keys, weights=wins, minlength=size)
+    net = np.bincount(keys, weights=pnl, minlength=size)
+    return [{
+        'trades': int(counts[i]),
+        'wins': int(won[i]),
+        'win_rate': round(float(won[i] / counts[i]) * 100, 2) if counts[i] else 0.0,
+        'net_pnl': float(net[i]),
+    } for i in range(size)]
+
+def equity_curve(entered, equity, depth):
+    if not len(equity):
+        return []
+    points = np.unique(np.linspace(0, len(equity) - 1, min(len(equity), EQUITY_CURVE_POINTS)).astype(np.int64))
+    times = np.datetime_as_string(entered[points], unit='s')
+    return [{'time': str(t), 'equity': float(e), 'drawdown': float(d)}
+            for t, e, d in zip(times, equity[points], depth[points])]
+
+def compute_analytics(entered, pnl, risk_reward, outcomes):
+    """Compute the analytics report from the arrays returned by `load_columns`."""
+    seconds = entered.astype(np.int64)
+    days = seconds // SECONDS_PER_DAY
+    wins, losses = outcomes == WIN, outcomes == LOSS
+    r_multiple = r_multiples(risk_reward, wins, losses)
+    equity = np.cumsum(pnl)
+    drawdowns, depth = drawdown(entered, equity)
+    # 1970-01-01 was a Thursday, so shift by three to count from Monday
+    weekday = (days + 3) % 7
+    hour = seconds % SECONDS_PER_DAY // 3600
+
+    by_hour = breakdown(hour, 24, pnl, wins)
+    by_weekday = breakdown(weekday, 7, pnl, wins)
+    return {
+        'summary': summary(pnl, r_multiple, wins, losses),
+        'drawdown': drawdowns,
+        'daily': daily_ratios(days, pnl),
+        'streaks': streaks(wins, losses),
+        'r_distribution': r_distribution(r_multiple),
+        'by_hour': [dict(hour=h, **row) for h, row in enumerate(by_hour)],
+        'by_weekday': [dict(weekday=WEEKDAYS[d], **row) for d, row in enumerate(by_weekday)],
+        'equity_curve': equity_curve(entered, equity, depth),
+    }
@@ -1,20 +1,77 @@
 import jwt
+import time
+from collections import namedtuple
 from functools import wraps
-from flask import request, jsonify, current_app
+from flask import request, jsonify, current_app, has_app_context, g
+from sqlalchemy import event
+from app import db
 from app.models.user import User
+from app.utils.cache import TTLCache
+
+# The identity handed to routes. Routes that need other User columns load them explicitly.
+Principal = namedtuple('Principal', ['id', 'username'])
+
+def init_auth_cache(app):
+    app.extensions['auth_cache'] = {
+        'tokens': TTLCache(app.config['AUTH_CACHE_SIZE'], app.config['AUTH_CACHE_TTL']),
+        'principals': TTLCache(app.config['AUTH_CACHE_SIZE'], app.config['AUTH_CACHE_TTL'])
+    }
+
+def auth_cache_stats():
+    return {name: cache.stats() for name, cache in current_app.extensions['auth_cache'].items()}
+
+def resolve_principal(token):
+    """Return the Principal for a token, or None if its user no longer exists. Raises jwt errors."""
+    caches = current_app.extensions['auth_cache']
+    user_id = caches['tokens'].get(token)
+    if user_id is None:
+        data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
+        user_id = data['id']
+        # Never keep a decoded token around past its own expiry
+        caches['tokens'].set(token, user_id, ttl=data['exp'] - time.time() if 'exp' in data else None)
+
+    principal = caches['principals'].get(user_id)
+    if principal is None:
+        row = db.session.query(User.id, User.username).filter_by(id=user_id).first()
+        if row is None:
+            return None
+        principal = Principal(row.id, row.username)
+        caches['principals'].set(user_id, principal)
+    return principal
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def invalidate_principal(mapper, connection, target):
+    if has_app_context() and 'auth_cache' in current_app.extensions:
+        current_app.extensions['auth_cache']['principals'].pop(target.id)
+
+def token_required(f=None, *, query_param=None):
+    """Pass the authenticated Principal to the view.
+
+    Use as @token_required, or @token_required(query_param='token') to also
+    accept the token in the query string, for clients such as EventSource
+    that can't set headers.
+    """
+    if f is None:
+        return lambda f: token_required(f, query_param=query_param)
 
-def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
+        # Sub-requests dispatched by POST /batch reuse the principal it authenticated
+        if g.get('batch_principal') is not None:
+            return f(g.batch_principal, *args, **kwargs)
         token = None
         if 'Authorization' in request.headers:
             token = request.headers['Authorization'].split(" ")[1]
+        elif query_param:
+            token = request.args.get(query_param)
         if not token:
             return jsonify({'message': 'Token is missing!'}), 401
         try:
-            data = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=["HS256"])
-            current_user = User.query.get(data['id'])
-        except:
+            current_user = resolve_principal(token)
+        except Exception:
+            return jsonify({'message': 'Token is invalid!'}), 401
+        if current_user is None:
             return jsonify({'message': 'Token is invalid!'}), 401
         return f(current_user, *args, **kwargs)
     return decorated
@@ -0,0 +1,32 @@
+import base64
+import binascii
+from flask import current_app
+from app import db
+from app.models.user import User
+from app.utils.storage import store_bytes, remove_blob
+
+def decode_avatar(value):
+    """Decode a base64 avatar, optionally given as a data URL. Raises ValueError."""
+    if ',' in value and value.startswith('data:'):
+        value = value.split(',', 1)[1]
+    try:
+        data = base64.b64decode(value, validate=True)
+    except (binascii.Error, ValueError):
+        raise ValueError('Avatar must be base64 encoded')
+    if not data:
+        raise ValueError('Avatar is empty')
+    if len(data) > current_app.config['AVATAR_MAX_BYTES']:
+        raise ValueError('Avatar is too large')
+    return data
+
+def save_avatar(user, data):
+    old_hash = user.avatar_hash
+    user.avatar_hash = store_bytes(current_app.config['AVATAR_FOLDER'], data)
+    if old_hash and old_hash != user.avatar_hash:
+        # Blobs are shared by content, so only delete once no other user points at it
+        still_used = db.session.query(User.id).filter(User.avatar_hash == old_hash, User.id != user.id).first()
+        if not still_used:
+            remove_blob(current_app.config['AVATAR_FOLDER'], old_hash)
+
+def avatar_url(user):
+    return f'/auth/avatar/{user.avatar_hash}' if user.avatar_hash else None
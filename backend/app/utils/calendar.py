@@ -0,0 +1,169 @@
+import csv
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import date
+
+logger = logging.getLogger(__name__)
+
+EVENT_FIELDS = ('date', 'time', 'type', 'symbol', 'details')
+CALENDAR_PATTERNS = ('*.csv', '*.json')
+
+def normalize_event(raw):
+    """Return (date, event) for a raw row, dropping empty fields. Raises ValueError without a valid date."""
+    event_date = str(raw.get('date') or '').strip()
+    date.fromisoformat(event_date)
+    event = {}
+    for field in EVENT_FIELDS[1:]:
+        value = raw.get(field)
+        if value not in (None, ''):
+            event[field] = str(value).strip()
+    return event_date, event
+
+def read_calendar_file(path):
+    """Yield raw events from a CSV file or a JSON list.
+
+    JSON may hold flat events or day groups shaped like the API response,
+    i.e. {"date": ..., "events": [...]}.
+    """
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            yield from csv.DictReader(f)
+        return
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    for item in data:
+        if 'events' in item:
+            for event in item['events']:
+                yield dict(event, date=item.get('date'))
+        else:
+            yield item
+
+class DateIndex:
+    """Events sorted by (date, time), with a parallel list of dates for bisection."""
+
+    def __init__(self, entries):
+        self.dates = [event_date for event_date, _ in entries]
+        self.events = [event for _, event in entries]
+
+    def slice(self, start, end):
+        # `end` is inclusive; ISO dates compare correctly as strings
+        lo = bisect_left(self.dates, start) if start else 0
+        hi = bisect_right(self.dates, end) if end else len(self.dates)
+        return self.dates[lo:hi], self.events[lo:hi]
+
+class EventCalendar:
+    """In-memory economic calendar built from the files in `folder`.
+
+    The files are parsed once and indexed by date, type and symbol. They are
+    re-read when their mtimes or sizes change; the check is a few stat() calls
+    and runs at most once every `reload_interval` seconds.
+    """
+
+    def __init__(self, folder, reload_interval=2):
+        self.folder = folder
+        self.reload_interval = reload_interval
+        self.lock = threading.Lock()
+        self.signature = None
+        self.checked_at = 0
+        self.state = (self.build([]), None, None)
+
+    def files(self):
+        paths = []
+        for pattern in CALENDAR_PATTERNS:
+            paths.extend(glob.glob(os.path.join(self.folder, pattern)))
+        return sorted(paths)
+
+    def current_signature(self):
+        signature = []
+        for path in self.files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def build(self, entries):
+        entries.sort(key=lambda entry: (entry[0], entry[1].get('time', '')))
+        by_type, by_symbol = {}, {}
+        for entry in entries:
+            by_type.setdefault(entry[1].get('type', '').lower(), []).append(entry)
+            if 'symbol' in entry[1]:
+                by_symbol.setdefault(entry[1]['symbol'].upper(), []).append(entry)
+        # Each sub-list keeps the global order, so it can be bisected the same way
+        return (
+            DateIndex(entries),
+            {key: DateIndex(value) for key, value in by_type.items()},
+            {key: DateIndex(value) for key, value in by_symbol.items()},
+        )
+
+    def load(self, signature):
+        entries = []
+        for path, _, _ in signature:
+            try:
+                for row_number, raw in enumerate(read_calendar_file(path), start=1):
+                    try:
+                        entries.append(normalize_event(raw))
+                    except (ValueError, TypeError, AttributeError):
+                        logger.warning('Skipping invalid calendar row %s in %s', row_number, path)
+            except (OSError, ValueError) as e:
+                logger.warning('Could not read calendar file %s: %s', path, e)
+        etag = hashlib.sha1(repr(signature).encode()).hexdigest()
+        last_modified = max((mtime for _, mtime, _ in signature), default=0) / 1e9 or None
+        # Swapped in with one assignment so readers never pair old events with a new ETag
+        self.state = (self.build(entries), etag, last_modified)
+
+    def refresh(self):
+        now = time.monotonic()
+        if now - self.checked_at < self.reload_interval:
+            return
+        with self.lock:
+            if now - self.checked_at < self.reload_interval:
+                return
+            signature = self.current_signature()
+            if signature != self.signature:
+                self.load(signature)
+                self.signature = signature
+            self.checked_at = now
+
+    def query(self, start=None, end=None, event_type=None, symbol=None):
+        """Return the events between `start` and `end` (inclusive ISO dates) grouped by day.
+
+        Also returns the ETag and Last-Modified timestamp of the data they came from.
+        """
+        self.refresh()
+        (everything, by_type, by_symbol), etag, last_modified = self.state
+        if symbol:
+            index = by_symbol.get(symbol.upper())
+        elif event_type:
+            index = by_type.get(event_type.lower())
+        else:
+            index = everything
+        if index is None:
+            return [], etag, last_modified
+        dates, events = index.slice(start, end)
+        if symbol and event_type:
+            event_type = event_type.lower()
+            matching = [i for i, event in enumerate(events) if event.get('type', '').lower() == event_type]
+            dates, events = [dates[i] for i in matching], [events[i] for i in matching]
+        return group_by_date(dates, events), etag, last_modified
+
+def group_by_date(dates, events):
+    days = []
+    current = None
+    for event_date, event in zip(dates, events):
+        if event_date != current:
+            current = event_date
+            days.append({'date': event_date, 'events': []})
+        days[-1]['events'].append(event)
+    return days
+
+def init_calendar(app):
+    os.makedirs(app.config['EVENTS_FOLDER'], exist_ok=True)
+    app.extensions['calendar'] = EventCalendar(app.config['EVENTS_FOLDER'], app.config['EVENTS_RELOAD_INTERVAL'])
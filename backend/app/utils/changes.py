@@ -0,0 +1,106 @@
+import queue
+import threading
+from collections import namedtuple
+from flask import current_app
+from app import db
+from app.utils.versions import get_version
+
+# Change notifications for GET /events/stream. Write paths publish after they
+# commit and every open stream of that user receives the change. The feed is
+# in-process: with several server processes, a stream only sees the writes
+# handled by its own process.
+
+Change = namedtuple('Change', ['entity', 'id', 'op', 'version'])
+
+class Subscription:
+    """One open stream. Changes queue up to `maxsize`; past that the stream is
+    marked overflowed and the client is told to reload instead."""
+
+    def __init__(self, user_id, maxsize):
+        self.user_id = user_id
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def get(self, timeout):
+        """Next Change, None after `timeout` seconds, or 'reset' after an overflow."""
+        if self.overflowed:
+            self.overflowed = False
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            return 'reset'
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+class ChangeFeed:
+    def __init__(self, queue_size, max_connections):
+        self.queue_size = queue_size
+        self.max_connections = max_connections
+        self.subscribers = {}
+        self.counts = {'published': 0, 'delivered': 0, 'overflows': 0, 'rejected': 0}
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        """Return a new Subscription, or None if the user has too many streams open."""
+        with self.lock:
+            subscriptions = self.subscribers.setdefault(user_id, set())
+            if len(subscriptions) >= self.max_connections:
+                self.counts['rejected'] += 1
+                return None
+            subscription = Subscription(user_id, self.queue_size)
+            subscriptions.add(subscription)
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            subscriptions = self.subscribers.get(subscription.user_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self.subscribers[subscription.user_id]
+
+    def publish(self, user_id, entity, entity_id, op):
+        """Send a change to the user's open streams. Call after the write has committed."""
+        with self.lock:
+            subscriptions = list(self.subscribers.get(user_id, ()))
+            self.counts['published'] += 1
+        if not subscriptions:
+            return
+        change = Change(entity, entity_id, op, get_version(user_id))
+        delivered, overflows = 0, 0
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(change)
+                delivered += 1
+            except queue.Full:
+                # A slow client gets one reset rather than an unbounded backlog
+                if not subscription.overflowed:
+                    subscription.overflowed = True
+                    overflows += 1
+        with self.lock:
+            self.counts['delivered'] += delivered
+            self.counts['overflows'] += overflows
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, users=len(self.subscribers),
+                        streams=sum(len(subscriptions) for subscriptions in self.subscribers.values()),
+                        queue_size=self.queue_size, max_connections=self.max_connections)
+
+def current_version(user_id):
+    """The user's data version, read without leaving a transaction open.
+
+    Streams stay open for minutes, and an open read transaction would keep
+    SQLite from checkpointing the WAL for as long.
+    """
+    version = get_version(user_id)
+    db.session.close()
+    return version
+
+def change_feed():
+    return current_app.extensions['change_feed']
+
+def init_change_feed(app):
+    app.extensions['change_feed'] = ChangeFeed(app.config['EVENT_STREAM_QUEUE_SIZE'],
+                                               app.config['EVENT_STREAM_MAX_CONNECTIONS'])
@@ -0,0 +1,52 @@
+from datetime import datetime, timedelta
+
+# Date filters are turned into half-open [start, end) datetime ranges so they
+# compare the raw column and can use the (user_id, <datetime>) indexes.
+
+def day_bounds(date_str):
+    start = datetime.strptime(date_str, '%Y-%m-%d')
+    return start, start + timedelta(days=1)
+
+def month_bounds(month_str):
+    start = datetime.strptime(month_str, '%Y-%m')
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+def parse_range_args(args):
+    start, end = None, None
+    if args.get('start'):
+        start = datetime.strptime(args['start'], '%Y-%m-%d')
+    if args.get('end'):
+        # `end` is inclusive for callers, so filter on the start of the next day
+        end = datetime.strptime(args['end'], '%Y-%m-%d') + timedelta(days=1)
+    return start, end
+
+def date_filters(column, args):
+    """Build range predicates on `column` from the date, month, start and end query args.
+
+    Raises ValueError with a message that can be returned to the client.
+    """
+    predicates = []
+    if args.get('date'):
+        try:
+            day_start, day_end = day_bounds(args['date'])
+        except ValueError:
+            raise ValueError('Invalid date format. Use YYYY-MM-DD.')
+        predicates += [column >= day_start, column < day_end]
+    elif args.get('month'):
+        try:
+            month_start, month_end = month_bounds(args['month'])
+        except ValueError:
+            raise ValueError('Invalid month format. Use YYYY-MM.')
+        predicates += [column >= month_start, column < month_end]
+
+    try:
+        start, end = parse_range_args(args)
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD.')
+    if start:
+        predicates.append(column >= start)
+    if end:
+        predicates.append(column < end)
+    return predicates
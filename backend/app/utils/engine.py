@@ -0,0 +1,59 @@
+import os
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from app import db
+
+def is_sqlite(url):
+    return make_url(url).get_backend_name() == 'sqlite'
+
+def is_memory_sqlite(url):
+    url = make_url(url)
+    return is_sqlite(url) and url.database in (None, '', ':memory:')
+
+def sqlite_database_path(url):
+    """Return the absolute path of a file-backed SQLite database, else None."""
+    if not is_sqlite(url) or is_memory_sqlite(url):
+        return None
+    return os.path.abspath(make_url(url).database)
+
+def engine_options(config):
+    """Build SQLALCHEMY_ENGINE_OPTIONS for the configured database URL."""
+    url = config['SQLALCHEMY_DATABASE_URI']
+    if is_memory_sqlite(url):
+        # In-memory databases use a single static connection, which takes
+        # no pool arguments
+        return {}
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+    }
+    if not is_sqlite(url):
+        options['pool_pre_ping'] = config['DB_POOL_PRE_PING']
+        options['pool_recycle'] = config['DB_POOL_RECYCLE']
+    return options
+
+def sqlite_pragmas(config):
+    return [
+        ('journal_mode', config['SQLITE_JOURNAL_MODE']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        ('busy_timeout', int(config['SQLITE_BUSY_TIMEOUT'])),
+        ('mmap_size', int(config['SQLITE_MMAP_SIZE'])),
+        ('cache_size', int(config['SQLITE_CACHE_SIZE'])),
+        ('foreign_keys', 'ON' if config['SQLITE_FOREIGN_KEYS'] else 'OFF'),
+    ]
+
+def init_engine(app):
+    """Apply the SQLite pragmas from the config to every new connection."""
+    if not is_sqlite(app.config['SQLALCHEMY_DATABASE_URI']):
+        return
+    pragmas = sqlite_pragmas(app.config)
+
+    @event.listens_for(db.engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name} = {value}')
+        finally:
+            cursor.close()
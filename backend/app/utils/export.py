@@ -0,0 +1,48 @@
+import csv
+import io
+import json
+from datetime import datetime
+from flask import Response, stream_with_context
+
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def export_value(value, fmt):
+    if isinstance(value, datetime):
+        return value.isoformat() + 'Z'
+    if fmt == 'csv' and isinstance(value, (list, dict)):
+        return json.dumps(value)
+    return value
+
+def generate_csv(rows, names, chunk_size):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(names)
+    # Send the header straight away so the download starts before the first query page arrives
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([export_value(value, 'csv') for value in row])
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def generate_ndjson(rows, names, chunk_size):
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({name: export_value(value, 'ndjson') for name, value in zip(names, row)}))
+        if len(lines) >= chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+def export_response(rows, names, fmt, filename, chunk_size=500):
+    """Stream `rows` (an iterable of tuples ordered like `names`) as a CSV or NDJSON download."""
+    generate = generate_csv if fmt == 'csv' else generate_ndjson
+    response = Response(stream_with_context(generate(rows, names, chunk_size)), mimetype=EXPORT_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}.{fmt}'
+    return response
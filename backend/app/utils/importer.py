@@ -0,0 +1,85 @@
+import csv
+import io
+import json
+
+IMPORT_FORMATS = ('csv', 'ndjson')
+READ_BUFFER_SIZE = 64 * 1024
+# Longest CSV field or NDJSON line accepted. The csv module's default of 128 KiB
+# is process-wide and easy to change elsewhere, so the importer sets the limit
+# it relies on.
+MAX_FIELD_SIZE = 1024 * 1024
+csv.field_size_limit(MAX_FIELD_SIZE)
+
+class StreamError(ValueError):
+    """The body could not be read past this row; nothing after it was imported."""
+
+def detect_format(requested, content_type):
+    if requested:
+        return requested.lower() if requested.lower() in IMPORT_FORMATS else None
+    content_type = (content_type or '').split(';')[0].strip().lower()
+    if content_type in ('text/csv', 'application/csv'):
+        return 'csv'
+    if content_type in ('application/x-ndjson', 'application/ndjson', 'application/jsonl'):
+        return 'ndjson'
+    return None
+
+def decode_lines(stream):
+    # Decoding line by line keeps memory flat, and an invalid byte only loses
+    # the line it is on rather than a whole read buffer of good rows
+    for line_number, line in enumerate(stream):
+        yield line.decode('utf-8-sig' if line_number == 0 else 'utf-8')
+
+def iter_csv_rows(stream):
+    text = decode_lines(stream)
+    row_number = 0
+    try:
+        for row_number, row in enumerate(csv.DictReader(text), start=1):
+            yield row_number, row
+    except (UnicodeDecodeError, csv.Error) as e:
+        # The reader can't resynchronize after either, so the rest of the body is lost
+        yield row_number + 1, StreamError(f'Could not read the CSV input: {e}')
+
+def read_lines(stream, limit):
+    """Yield the lines of `stream`, or None in place of a line longer than `limit` bytes."""
+    while True:
+        line = stream.readline(limit + 1)
+        if not line:
+            return
+        if len(line) > limit:
+            # Drop the rest of the line without holding it in memory
+            while line and not line.endswith(b'\n'):
+                line = stream.readline(limit)
+            yield None
+            continue
+        yield line
+
+def iter_ndjson_rows(stream):
+    row_number = 0
+    for line in read_lines(stream, MAX_FIELD_SIZE):
+        if line is None:
+            row_number += 1
+            yield row_number, ValueError(f'Line is longer than {MAX_FIELD_SIZE} bytes')
+            continue
+        if not line.strip():
+            continue
+        row_number += 1
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield row_number, e
+            continue
+        if not isinstance(row, dict):
+            yield row_number, ValueError('Each line must be a JSON object')
+            continue
+        yield row_number, row
+
+def iter_rows(stream, fmt):
+    """Yield (row_number, row) pairs; row is an exception when the line could not be parsed.
+
+    A StreamError is always the last pair: reading stopped there.
+    """
+    # The WSGI input stream is unbuffered, and line iteration over it reads a byte at a time
+    stream = io.BufferedReader(stream, READ_BUFFER_SIZE)
+    if fmt == 'csv':
+        return iter_csv_rows(stream)
+    return iter_ndjson_rows(stream)
@@ -0,0 +1,90 @@
+from app import db
+from app.models.label import TradeConfluence, PlaybookLabel
+from app.models.playbook import Playbook
+from app.models.trade import Trade
+
+PLAYBOOK_LABEL_KINDS = {'confluence': 'confluences', 'tag': 'tags'}
+MAX_LABEL_LENGTH = 100
+REBUILD_BATCH_SIZE = 1000
+
+def normalize_labels(values):
+    """Return the distinct, stripped, non-empty labels in a JSON list value."""
+    if not isinstance(values, (list, tuple)):
+        return []
+    labels = []
+    for value in values:
+        if value is None or isinstance(value, (dict, list)):
+            continue
+        label = str(value).strip()[:MAX_LABEL_LENGTH]
+        if label and label not in labels:
+            labels.append(label)
+    return labels
+
+def trade_confluence_rows(user_id, trade_id, confluences):
+    return [{'user_id': user_id, 'label': label, 'trade_id': trade_id} for label in normalize_labels(confluences)]
+
+def playbook_label_rows(playbook):
+    rows = []
+    for kind, attribute in PLAYBOOK_LABEL_KINDS.items():
+        for label in normalize_labels(getattr(playbook, attribute)):
+            rows.append({'user_id': playbook.user_id, 'kind': kind, 'label': label, 'playbook_id': playbook.id})
+    return rows
+
+def insert_rows(model, rows):
+    if rows:
+        db.session.execute(model.__table__.insert(), rows)
+
+def sync_trade_confluences(trade):
+    """Replace the trade's confluence rows in the current transaction. The trade must have an id."""
+    db.session.execute(db.delete(TradeConfluence).where(TradeConfluence.trade_id == trade.id))
+    insert_rows(TradeConfluence, trade_confluence_rows(trade.user_id, trade.id, trade.confluences))
+
+def delete_trade_confluences(trade_id):
+    db.session.execute(db.delete(TradeConfluence).where(TradeConfluence.trade_id == trade_id))
+
+def sync_playbook_labels(playbook):
+    """Replace the playbook's label rows in the current transaction. The playbook must have an id."""
+    db.session.execute(db.delete(PlaybookLabel).where(PlaybookLabel.playbook_id == playbook.id))
+    insert_rows(PlaybookLabel, playbook_label_rows(playbook))
+
+def delete_playbook_labels(playbook_id):
+    db.session.execute(db.delete(PlaybookLabel).where(PlaybookLabel.playbook_id == playbook_id))
+
+def rebuild_labels():
+    """Recompute both label tables from the JSON columns. Returns the number of rows written."""
+    db.session.execute(db.delete(TradeConfluence))
+    db.session.execute(db.delete(PlaybookLabel))
+    count = 0
+    rows = []
+    trades = db.session.query(Trade.user_id, Trade.id, Trade.confluences).yield_per(REBUILD_BATCH_SIZE)
+    for user_id, trade_id, confluences in trades:
+        rows.extend(trade_confluence_rows(user_id, trade_id, confluences))
+        if len(rows) >= REBUILD_BATCH_SIZE:
+            insert_rows(TradeConfluence, rows)
+            count += len(rows)
+            rows = []
+    insert_rows(TradeConfluence, rows)
+    count += len(rows)
+    for playbook in Playbook.query:
+        rows = playbook_label_rows(playbook)
+        insert_rows(PlaybookLabel, rows)
+        count += len(rows)
+    db.session.commit()
+    return count
+
+def has_labels(column):
+    # JSON columns hold the text 'null' or '[]' when there is nothing to index
+    return db.and_(column.isnot(None), db.cast(column, db.Text).notin_(['null', '[]']))
+
+def has_labels_to_index():
+    return db.session.query(Trade.id).filter(has_labels(Trade.confluences)).first() is not None \
+        or db.session.query(Playbook.id).filter(
+            db.or_(has_labels(Playbook.confluences), has_labels(Playbook.tags))).first() is not None
+
+def ensure_labels():
+    # Databases created before the label tables existed start with them empty
+    if db.session.query(TradeConfluence.trade_id).first() is not None \
+            or db.session.query(PlaybookLabel.playbook_id).first() is not None:
+        return
+    if has_labels_to_index():
+        rebuild_labels()
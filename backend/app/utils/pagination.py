@@ -0,0 +1,49 @@
+from datetime import datetime
+from app import db
+import base64
+import json
+
+# Keyset pagination over (<datetime>, id): the cursor is the sort key of the
+# last row returned, and the next page starts strictly after it.
+
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(sort_datetime, row_id):
+    raw = json.dumps([sort_datetime.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+    sort_datetime, row_id = json.loads(raw)
+    return datetime.fromisoformat(sort_datetime), int(row_id)
+
+def parse_page_args(args):
+    """Return (limit, cursor key) from the limit and cursor args. Raises ValueError.
+
+    Pagination is opt-in: limit is None when neither arg is given. A cursor
+    without a limit pages by MAX_PAGE_SIZE.
+    """
+    limit = None
+    if 'limit' in args:
+        try:
+            limit = int(args['limit'])
+        except ValueError:
+            raise ValueError('limit must be a positive integer.')
+        if limit < 1:
+            raise ValueError('limit must be a positive integer.')
+    key = None
+    if args.get('cursor'):
+        try:
+            key = decode_cursor(args['cursor'])
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor.')
+        limit = limit or MAX_PAGE_SIZE
+    if limit is not None:
+        limit = min(limit, MAX_PAGE_SIZE)
+    return limit, key
+
+def after(datetime_column, id_column, key):
+    """Predicate for rows that sort after the cursor `key`."""
+    sort_datetime, row_id = key
+    return db.or_(datetime_column > sort_datetime,
+                  db.and_(datetime_column == sort_datetime, id_column > row_id))
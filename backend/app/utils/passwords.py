@@ -0,0 +1,132 @@
+import atexit
+import multiprocessing
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import current_app
+from werkzeug.security import DEFAULT_PBKDF2_ITERATIONS, generate_password_hash, check_password_hash
+
+class HasherBusy(Exception):
+    """Raised when no hashing slot frees up within the queue timeout."""
+
+# Hashers with a running pool; their workers are stopped when the process exits
+running_hashers = weakref.WeakSet()
+
+@atexit.register
+def shutdown_hashers():
+    for hasher in list(running_hashers):
+        hasher.shutdown()
+
+def hash_method(pwhash):
+    # Werkzeug hashes look like "pbkdf2:sha256:1000000$salt$hash"; the prefix
+    # holds every cost parameter
+    return pwhash.split('$', 1)[0]
+
+def normalize_method(method):
+    """Spell out Werkzeug's defaults, e.g. "pbkdf2" -> "pbkdf2:sha256:1000000". Raises ValueError."""
+    name, *args = method.split(':')
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    if name == 'scrypt':
+        n, r, p = (int(arg) for arg in args) if args else (2 ** 15, 8, 1)
+        return f'scrypt:{n}:{r}:{p}'
+    raise ValueError(f'Unsupported password hash method: {method}')
+
+class PasswordHasher:
+    """Runs PBKDF2/scrypt on a bounded process pool so CPU-bound hashing
+    never occupies the threads that serve the rest of the API.
+
+    At most `max_pending` hashes are queued or running at once; callers
+    wait up to `queue_timeout` seconds for a slot and then get HasherBusy.
+    With `workers` set to 0 hashing runs inline on the request thread,
+    still subject to the same limit.
+    """
+
+    def __init__(self, method, workers, max_pending, queue_timeout):
+        self.method = method
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.max_pending = max_pending
+        self.executor = None
+        self.lock = threading.Lock()
+        self.counts = {'hashed': 0, 'verified': 0, 'rejected': 0}
+
+    def start(self):
+        """Return the worker pool, creating it on first use.
+
+        Apps that never hash a password (CLI commands, tests, the benchmark)
+        then never start worker processes. First use is on a request thread,
+        when the server, cache and rendition threads already exist, so the
+        workers must not be forked from this process: a fork could copy a lock
+        held by another thread and deadlock the child. They come from a
+        fork server instead, or are spawned where there is none. Either way
+        the main module is imported again in each worker, so it must not
+        start a server on import.
+        """
+        with self.lock:
+            if self.workers and self.executor is None:
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                running_hashers.add(self)
+            return self.executor
+
+    def shutdown(self):
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(self, fn, *args):
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            with self.lock:
+                self.counts['rejected'] += 1
+            raise HasherBusy()
+        try:
+            if not self.workers:
+                return fn(*args)
+            executor = self.start()
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool:
+                # A worker died; the next call starts a fresh pool
+                with self.lock:
+                    if self.executor is executor:
+                        self.executor = None
+                raise HasherBusy()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        pwhash = self.run(generate_password_hash, password, self.method)
+        with self.lock:
+            self.counts['hashed'] += 1
+        return pwhash
+
+    def verify(self, pwhash, password):
+        valid = self.run(check_password_hash, pwhash, password)
+        with self.lock:
+            self.counts['verified'] += 1
+        return valid
+
+    def needs_rehash(self, pwhash):
+        return hash_method(pwhash) != self.method
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counts, method=self.method, workers=self.workers, max_pending=self.max_pending)
+
+def password_hasher():
+    return current_app.extensions['password_hasher']
+
+def init_password_hasher(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        normalize_method(app.config['PASSWORD_HASH_METHOD']),
+        app.config['PASSWORD_HASH_WORKERS'],
+        app.config['PASSWORD_HASH_QUEUE_SIZE'],
+        app.config['PASSWORD_HASH_QUEUE_TIMEOUT'],
+    )
@@ -0,0 +1,152 @@
+from collections import namedtuple
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.playbook import Playbook
+from app.models.playbook_stats import PlaybookStats
+from app.models.trade import Trade
+from app.utils.analytics import r_multiple_sql
+
+# The subset of a trade that decides which playbooks it counts towards.
+# Taken before and after a write so both the old and new playbooks are invalidated.
+AttributionSnapshot = namedtuple('AttributionSnapshot', ['playbook_id', 'entry_model', 'trade_model'])
+
+def snapshot(trade):
+    return AttributionSnapshot(trade.playbook_id, trade.entry_model, trade.trade_model)
+
+def attributed_trades(playbook_ids):
+    """Subquery pairing each playbook with its trades: the ones linked to it,
+    plus unlinked trades with the same entry and trade model.
+
+    Written as two joins rather than one OR condition so each side can use
+    its own trade index.
+    """
+    playbook, trade = Playbook.__table__, Trade.__table__
+    columns = (playbook.c.id.label('owner_id'), trade.c.id, trade.c.setup_type, trade.c.result,
+               trade.c.risk_reward, trade.c.total_pnl)
+    linked = db.select(*columns).join(trade, db.and_(
+        trade.c.user_id == playbook.c.user_id,
+        trade.c.playbook_id == playbook.c.playbook_id,
+    )).where(playbook.c.id.in_(playbook_ids))
+    matched = db.select(*columns).join(trade, db.and_(
+        trade.c.user_id == playbook.c.user_id,
+        trade.c.entry_model == playbook.c.entry_model,
+        trade.c.trade_model == playbook.c.trade_model,
+        trade.c.playbook_id.is_(None),
+    )).where(playbook.c.id.in_(playbook_ids))
+    return db.union_all(linked, matched).subquery()
+
+def insert_ignoring_conflicts(dialect):
+    if dialect == 'sqlite':
+        return sqlite.insert(PlaybookStats).on_conflict_do_nothing()
+    if dialect == 'postgresql':
+        return postgresql.insert(PlaybookStats).on_conflict_do_nothing()
+    return PlaybookStats.__table__.insert()
+
+def stats_rows(playbook_ids):
+    return db.select(*PlaybookStats.__table__.columns).where(PlaybookStats.playbook_id.in_(playbook_ids))
+
+def compute_stats(playbook_ids):
+    """Fill the cache for `playbook_ids` with one grouped INSERT ... SELECT and
+    return the new rows.
+
+    Computing and storing in a single statement means a trade write either
+    lands before it (and is counted) or after it (and invalidates the rows),
+    so a stale result can never be cached. It runs in its own transaction on
+    a separate connection, so a GET that fills the cache doesn't commit the
+    request's session.
+    """
+    playbook, trade = Playbook.__table__, attributed_trades(playbook_ids)
+    setup_type = db.func.coalesce(trade.c.setup_type, '')
+    select = db.select(
+        playbook.c.id,
+        setup_type,
+        db.func.count(trade.c.id),
+        db.func.coalesce(db.func.sum(db.case((trade.c.result == 'Win', 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(db.case((trade.c.result == 'Loss', 1), else_=0)), 0),
+        db.func.coalesce(db.func.sum(r_multiple_sql(trade.c.result, trade.c.risk_reward)), 0.0),
+        db.func.coalesce(db.func.sum(trade.c.total_pnl), 0.0),
+    ).select_from(playbook.outerjoin(trade, trade.c.owner_id == playbook.c.id)) \
+        .where(playbook.c.id.in_(playbook_ids)) \
+        .group_by(playbook.c.id, setup_type)
+    columns = ['playbook_id', 'setup_type', 'trade_count', 'wins', 'losses', 'r_multiple_sum', 'net_pnl']
+    insert = insert_ignoring_conflicts(db.engine.dialect.name).from_select(columns, select)
+    try:
+        with db.engine.begin() as connection:
+            connection.execute(insert)
+            return connection.execute(stats_rows(playbook_ids)).all()
+    except IntegrityError:
+        # Another request cached the same playbooks first
+        with db.engine.connect() as connection:
+            return connection.execute(stats_rows(playbook_ids)).all()
+
+def format_stats(rows):
+    def summarize(trades, wins, losses, r_multiple_sum, net_pnl):
+        return {
+            'trades': trades,
+            'wins': wins,
+            'losses': losses,
+            'win_rate': round(wins / trades * 100, 2) if trades else 0.0,
+            'average_r': round(r_multiple_sum / trades, 2) if trades else 0.0,
+            'net_pnl': net_pnl,
+        }
+
+    totals = [0, 0, 0, 0.0, 0.0]
+    setup_types = {}
+    for row in rows:
+        values = (row.trade_count, row.wins, row.losses, row.r_multiple_sum, row.net_pnl)
+        if not row.trade_count:
+            continue
+        totals = [total + value for total, value in zip(totals, values)]
+        setup_types[row.setup_type] = summarize(*values)
+    return dict(summarize(*totals), setup_types=setup_types)
+
+def get_stats(playbook_ids):
+    """Return {playbook row id: stats} for `playbook_ids`, computing the ones not cached yet."""
+    playbook_ids = list(playbook_ids)
+    if not playbook_ids:
+        return {}
+    rows = {playbook_id: [] for playbook_id in playbook_ids}
+    for row in db.session.execute(stats_rows(playbook_ids)):
+        rows[row.playbook_id].append(row)
+    missing = [playbook_id for playbook_id, cached in rows.items() if not cached]
+    if missing:
+        for row in compute_stats(missing):
+            rows[row.playbook_id].append(row)
+    return {playbook_id: format_stats(cached) for playbook_id, cached in rows.items()}
+
+def invalidate(user_id, snapshots):
+    """Drop the cached stats of every playbook the given trade snapshots count towards.
+
+    Runs in the current transaction; the caller commits.
+    """
+    linked, models = set(), set()
+    for snap in snapshots:
+        if snap is None:
+            continue
+        if snap.playbook_id:
+            linked.add(snap.playbook_id)
+        else:
+            models.add((snap.entry_model, snap.trade_model))
+    conditions = []
+    if linked:
+        conditions.append(Playbook.playbook_id.in_(linked))
+    if models:
+        conditions.append(db.tuple_(Playbook.entry_model, Playbook.trade_model).in_(models))
+    if not conditions:
+        return
+    affected = db.select(Playbook.id).where(Playbook.user_id == user_id, db.or_(*conditions))
+    db.session.execute(db.delete(PlaybookStats).where(PlaybookStats.playbook_id.in_(affected)))
+
+def invalidate_playbooks(playbook_ids):
+    db.session.execute(db.delete(PlaybookStats).where(PlaybookStats.playbook_id.in_(playbook_ids)))
+
+def invalidate_user(user_id):
+    affected = db.select(Playbook.id).where(Playbook.user_id == user_id)
+    db.session.execute(db.delete(PlaybookStats).where(PlaybookStats.playbook_id.in_(affected)))
+
+def clear_stats():
+    """Empty the cache; it is recomputed on the next read. Returns the number of rows removed."""
+    count = db.session.execute(db.delete(PlaybookStats)).rowcount
+    db.session.commit()
+    return count
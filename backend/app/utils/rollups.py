@@ -0,0 +1,113 @@
+from collections import defaultdict, namedtuple
+from app import db
+from app.models.rollup import DailyPnl, MonthlyPnl
+from app.models.trade import Trade
+
+ROLLUP_FIELDS = ('trade_count', 'wins', 'losses', 'gross_profit', 'gross_loss', 'net_pnl')
+KEY_COLUMNS = {DailyPnl: 'day', MonthlyPnl: 'month'}
+
+# The subset of a trade that the rollups depend on. Taken before and after a
+# write so the old contribution can be subtracted and the new one added.
+TradeSnapshot = namedtuple('TradeSnapshot', ['user_id', 'entry_datetime', 'result', 'total_pnl'])
+
+def snapshot(trade):
+    return TradeSnapshot(trade.user_id, trade.entry_datetime, trade.result, trade.total_pnl)
+
+def aggregate(changes):
+    """Sum (snapshot, sign) pairs into per-row deltas keyed by (model, user_id, key)."""
+    deltas = defaultdict(lambda: [0, 0, 0, 0.0, 0.0, 0.0])
+    for snap, sign in changes:
+        if snap is None:
+            continue
+        pnl = snap.total_pnl
+        win = sign if snap.result == 'Win' else 0
+        loss = sign if snap.result == 'Loss' else 0
+        profit = sign * pnl if pnl > 0 else 0.0
+        loss_amount = -sign * pnl if pnl < 0 else 0.0
+        day = snap.entry_datetime.date()
+        for key in ((DailyPnl, snap.user_id, day), (MonthlyPnl, snap.user_id, day.replace(day=1))):
+            delta = deltas[key]
+            delta[0] += sign
+            delta[1] += win
+            delta[2] += loss
+            delta[3] += profit
+            delta[4] += loss_amount
+            delta[5] += sign * pnl
+    return deltas
+
+def load_rows(keys):
+    """Load the existing rollup rows for (model, user_id, key) `keys`, one query per model."""
+    rows = {}
+    for model, key_name in KEY_COLUMNS.items():
+        wanted = [(user_id, key) for row_model, user_id, key in keys if row_model is model]
+        if not wanted:
+            continue
+        key_column = getattr(model, key_name)
+        for row in model.query.filter(db.tuple_(model.user_id, key_column).in_(wanted)):
+            rows[(model, row.user_id, getattr(row, key_name))] = row
+    return rows
+
+def apply_changes(changes):
+    """Apply rollup deltas in the current session; the caller commits."""
+    deltas = {key: delta for key, delta in aggregate(changes).items() if any(delta)}
+    # A bulk import touches hundreds of days per batch, so look them up together
+    rows = load_rows(deltas)
+    for (model, user_id, key), delta in deltas.items():
+        row = rows.get((model, user_id, key))
+        if row is None:
+            row = model(user_id=user_id, **{KEY_COLUMNS[model]: key}, **{field: 0 for field in ROLLUP_FIELDS})
+            db.session.add(row)
+        for field, value in zip(ROLLUP_FIELDS, delta):
+            setattr(row, field, getattr(row, field) + value)
+        if row.trade_count <= 0:
+            if row in db.session.new:
+                db.session.expunge(row)
+            else:
+                db.session.delete(row)
+
+def record_change(old=None, new=None):
+    apply_changes(((old, -1), (new, 1)))
+
+def compute_rollups(user_id=None):
+    """Recompute every rollup row from the trade table, streaming the trades."""
+    query = db.session.query(Trade.user_id, Trade.entry_datetime, Trade.result, Trade.total_pnl)
+    if user_id is not None:
+        query = query.filter(Trade.user_id == user_id)
+    rows = (TradeSnapshot(*row) for row in query.yield_per(5000))
+    return aggregate((snap, 1) for snap in rows)
+
+def rebuild_rollups(user_id=None):
+    fresh = compute_rollups(user_id)
+    for model in KEY_COLUMNS:
+        query = model.query
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        query.delete(synchronize_session=False)
+    for (model, row_user_id, key), delta in fresh.items():
+        db.session.add(model(user_id=row_user_id, **{KEY_COLUMNS[model]: key}, **dict(zip(ROLLUP_FIELDS, delta))))
+    db.session.commit()
+    return len(fresh)
+
+def ensure_rollups():
+    # Databases created before the rollup tables existed start with them empty
+    if db.session.query(DailyPnl.user_id).first() is None and db.session.query(Trade.id).first() is not None:
+        rebuild_rollups()
+
+def check_rollups(user_id=None, tolerance=1e-6):
+    """Return the keys whose stored rollup differs from a fresh recomputation."""
+    fresh = compute_rollups(user_id)
+    stored = {}
+    for model, key_name in KEY_COLUMNS.items():
+        query = model.query
+        if user_id is not None:
+            query = query.filter_by(user_id=user_id)
+        for row in query:
+            stored[(model, row.user_id, getattr(row, key_name))] = [getattr(row, field) for field in ROLLUP_FIELDS]
+
+    mismatches = []
+    for key in set(fresh) | set(stored):
+        expected = fresh.get(key, [0] * len(ROLLUP_FIELDS))
+        actual = stored.get(key, [0] * len(ROLLUP_FIELDS))
+        if any(abs(a - b) > tolerance for a, b in zip(expected, actual)):
+            mismatches.append(key)
+    return mismatches
@@ -0,0 +1,85 @@
+import os
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+from app import db
+from app.models.screenshot import Screenshot
+from app.models.trade import Trade
+from app.utils.storage import blob_path, is_valid_hash, publish_blob, spool_stream
+from app.utils.thumbnails import remove_renditions
+
+# Screenshots are stored once per distinct content under UPLOAD_FOLDER/ab/cd/<sha256>
+# and referenced by trades as "<sha256>.<ext>". Files uploaded before that
+# scheme live directly in UPLOAD_FOLDER under their original name.
+
+def storage_key(filename):
+    digest = filename.split('.', 1)[0]
+    return digest if is_valid_hash(digest) else filename
+
+def is_content_addressed(filename):
+    return storage_key(filename) != filename
+
+def screenshot_path(filename):
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    if is_content_addressed(filename):
+        return blob_path(upload_folder, storage_key(filename))
+    return os.path.join(upload_folder, filename)
+
+def save_screenshot(file, extension):
+    """Store an uploaded file, take a reference on it and return the filename to put on the trade."""
+    upload_folder = current_app.config['UPLOAD_FOLDER']
+    tmp_path, digest, size = spool_stream(upload_folder, file.stream)
+    try:
+        # Count in SQL so concurrent uploads of the same content can't lose an increment
+        increment = db.update(Screenshot).where(Screenshot.hash == digest).values(ref_count=Screenshot.ref_count + 1)
+        if not db.session.execute(increment).rowcount:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(Screenshot(hash=digest, size=size, ref_count=1))
+            except IntegrityError:
+                # Another upload of the same content created the row first
+                db.session.execute(increment)
+        # Publish only once the reference is taken: the write holds the lock
+        # delete_screenshot_files() checks under, so the file can't be
+        # unlinked between here and the commit
+        publish_blob(upload_folder, tmp_path, digest)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    current_app.extensions['renditions'].submit(screenshot_path(digest), upload_folder, digest)
+    return f'{digest}.{extension}'
+
+def release_screenshot(filename, trade_id):
+    """Drop trade `trade_id`'s reference. Returns True when no trade uses the file any more."""
+    if is_content_addressed(filename):
+        digest = storage_key(filename)
+        ref_count = db.session.execute(
+            db.update(Screenshot).where(Screenshot.hash == digest)
+            .values(ref_count=Screenshot.ref_count - 1).returning(Screenshot.ref_count)
+        ).scalar()
+        if ref_count is None or ref_count > 0:
+            return False
+        db.session.execute(db.delete(Screenshot).where(Screenshot.hash == digest))
+        return True
+    # Legacy files have no refcount row, so look for any other trade using the name
+    other = db.session.query(Trade.id).filter(Trade.screenshot_filename == filename, Trade.id != trade_id).first()
+    return other is None
+
+def delete_screenshot_files(filename):
+    """Remove an orphaned screenshot and its renditions. Call after the releasing transaction commits."""
+    if is_content_addressed(filename):
+        digest = storage_key(filename)
+        # A no-op write takes the database write lock and tells whether an upload
+        # of the same content has referenced it again since the release. Holding
+        # the lock until the files are gone keeps that upload from publishing
+        # its copy in between.
+        touch = db.update(Screenshot).where(Screenshot.hash == digest).values(ref_count=Screenshot.ref_count)
+        if db.session.execute(touch).rowcount:
+            db.session.rollback()
+            return
+    try:
+        os.remove(screenshot_path(filename))
+    except FileNotFoundError:
+        pass # Ignore if file does not exist
+    remove_renditions(current_app.config['UPLOAD_FOLDER'], storage_key(filename))
+    db.session.commit()
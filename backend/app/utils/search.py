@@ -0,0 +1,182 @@
+import html
+from sqlalchemy import text
+from app import db
+from app.utils.engine import is_sqlite
+
+# Notes and trade journal text are indexed in external-content FTS5 tables.
+# The rows live in `note` and `trade` as before; SQL triggers keep the index
+# in step with every insert, update and delete. Bulk imports defer the
+# insert trigger and index each batch with one statement instead.
+# Other databases have no FTS5 and fall back to unranked LIKE matching.
+
+SEARCH_TYPES = ('note', 'trade')
+
+# Snippets are highlighted with control characters so the surrounding user
+# text can be HTML-escaped before the markers are turned into <mark> tags
+HIGHLIGHT_OPEN = '\x02'
+HIGHLIGHT_CLOSE = '\x03'
+SNIPPET_TOKENS = 16
+
+SEARCH_INDEXES = {
+    'note_fts': {
+        'table': 'note',
+        'columns': ('title', 'content'),
+    },
+    'trade_fts': {
+        'table': 'trade',
+        'columns': ('ticker', 'trade_note', 'roadmap'),
+    },
+}
+
+TOKENIZER = 'porter unicode61 remove_diacritics 2'
+# Holds the names of indexes whose insert trigger is paused by defer_indexing
+DEFERRED_TABLE = 'search_index_deferred'
+
+def index_statements(name, table, columns):
+    column_list = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    delete_old = (f"INSERT INTO {name}({name}, rowid, {column_list}) "
+                  f"VALUES ('delete', old.id, {old_values});")
+    insert_new = f"INSERT INTO {name}(rowid, {column_list}) VALUES (new.id, {new_values});"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+        f"{column_list}, content='{table}', content_rowid='id', tokenize='{TOKENIZER}')",
+        f'CREATE TRIGGER IF NOT EXISTS {name}_ai AFTER INSERT ON "{table}" '
+        f"WHEN NOT EXISTS (SELECT 1 FROM {DEFERRED_TABLE} WHERE name = '{name}') BEGIN {insert_new} END",
+        f'CREATE TRIGGER IF NOT EXISTS {name}_ad AFTER DELETE ON "{table}" BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS {name}_au AFTER UPDATE OF {column_list} ON "{table}" '
+        f'BEGIN {delete_old} {insert_new} END',
+    ]
+
+def has_fts():
+    return is_sqlite(db.engine.url)
+
+def create_search_index():
+    """Create the FTS tables and triggers, populating any index that is new."""
+    if not has_fts():
+        return
+    with db.engine.begin() as connection:
+        existing = set(connection.execute(text("SELECT name FROM sqlite_master WHERE type = 'table'")).scalars())
+        connection.execute(text(f'CREATE TABLE IF NOT EXISTS {DEFERRED_TABLE} (name TEXT PRIMARY KEY)'))
+        for name, spec in SEARCH_INDEXES.items():
+            if DEFERRED_TABLE not in existing:
+                # Insert triggers created before deferral existed are replaced
+                connection.execute(text(f'DROP TRIGGER IF EXISTS {name}_ai'))
+            for statement in index_statements(name, spec['table'], spec['columns']):
+                connection.execute(text(statement))
+            if name not in existing:
+                connection.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+
+def rebuild_search_index():
+    if not has_fts():
+        return
+    with db.engine.begin() as connection:
+        for name in SEARCH_INDEXES:
+            connection.execute(text(f"INSERT INTO {name}({name}) VALUES ('rebuild')"))
+
+def index_name(table):
+    return next(name for name, spec in SEARCH_INDEXES.items() if spec['table'] == table)
+
+def defer_indexing(table):
+    """Pause indexing of rows inserted into `table` for the rest of the transaction.
+
+    The pause is an uncommitted row, so other connections never see it. Call
+    index_rows before committing to index the new rows and lift the pause.
+    """
+    if has_fts():
+        db.session.execute(text(f'INSERT OR IGNORE INTO {DEFERRED_TABLE} (name) VALUES (:name)'),
+                           {'name': index_name(table)})
+
+def index_rows(table, ids):
+    """Index the rows of `table` with `ids`, inserted after defer_indexing, in one statement."""
+    if not has_fts():
+        return
+    name = index_name(table)
+    column_list = ', '.join(SEARCH_INDEXES[name]['columns'])
+    db.session.execute(
+        text(f'INSERT INTO {name}(rowid, {column_list}) SELECT id, {column_list} FROM "{table}" WHERE id IN :ids')
+        .bindparams(db.bindparam('ids', expanding=True)), {'ids': list(ids)})
+    db.session.execute(text(f'DELETE FROM {DEFERRED_TABLE} WHERE name = :name'), {'name': name})
+
+def match_expression(query):
+    """Turn free text into an FTS5 query that matches every term.
+
+    Each term is quoted so punctuation in the input can't produce a syntax
+    error, and the last term is a prefix match for search-as-you-type.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    if not terms:
+        return None
+    terms[-1] += '*'
+    return ' '.join(terms)
+
+def highlight(snippet):
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(HIGHLIGHT_OPEN, '<mark>').replace(HIGHLIGHT_CLOSE, '</mark>')
+
+NOTE_SEARCH = f"""
+    SELECT 'note' AS type, note.id AS id, note.title AS title,
+           snippet(note_fts, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet,
+           note.created_at AS timestamp, bm25(note_fts, 4.0, 1.0) AS rank
+    FROM note_fts JOIN note ON note.id = note_fts.rowid
+    WHERE note_fts MATCH :match AND note.user_id = :user_id
+"""
+
+TRADE_SEARCH = f"""
+    SELECT 'trade' AS type, trade.id AS id, trade.ticker AS title,
+           snippet(trade_fts, -1, :open, :close, '…', {SNIPPET_TOKENS}) AS snippet,
+           trade.entry_datetime AS timestamp, bm25(trade_fts, 4.0, 1.0, 1.0) AS rank
+    FROM trade_fts JOIN trade ON trade.id = trade_fts.rowid
+    WHERE trade_fts MATCH :match AND trade.user_id = :user_id
+"""
+
+SEARCH_FIELDS = {
+    'note': ('title', 'created_at'),
+    'trade': ('ticker', 'entry_datetime'),
+}
+
+def like_search(user_id, query, types, limit, offset):
+    """Hits whose indexed columns contain every term, newest first and without snippets."""
+    terms = query.split()
+    if not terms:
+        return []
+    parts = []
+    for search_type in types:
+        spec = SEARCH_INDEXES[f'{search_type}_fts']
+        table = db.metadata.tables[spec['table']]
+        title, timestamp = SEARCH_FIELDS[search_type]
+        conditions = [table.c.user_id == user_id]
+        for term in terms:
+            pattern = '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+            conditions.append(db.or_(*[table.c[column].ilike(pattern, escape='\\') for column in spec['columns']]))
+        parts.append(db.select(db.literal(search_type).label('type'), table.c.id.label('id'),
+                               table.c[title].label('title'), db.null().label('snippet'),
+                               table.c[timestamp].label('timestamp')).where(*conditions))
+    union = db.union_all(*parts).subquery()
+    sql = db.select(union).order_by(union.c.timestamp.desc(), union.c.id.desc()).limit(limit).offset(offset)
+    return [dict(row) for row in db.session.execute(sql).mappings()]
+
+def search(user_id, query, types=SEARCH_TYPES, limit=20, offset=0):
+    """Return up to `limit` ranked hits for `query`, best match first."""
+    if not has_fts():
+        return like_search(user_id, query, types, limit, offset)
+    match = match_expression(query)
+    if match is None:
+        return []
+    parts = []
+    if 'note' in types:
+        parts.append(NOTE_SEARCH)
+    if 'trade' in types:
+        parts.append(TRADE_SEARCH)
+    sql = ' UNION ALL '.join(parts) + ' ORDER BY rank, timestamp DESC LIMIT :limit OFFSET :offset'
+    rows = db.session.execute(text(sql), {
+        'match': match,
+        'user_id': user_id,
+        'open': HIGHLIGHT_OPEN,
+        'close': HIGHLIGHT_CLOSE,
+        'limit': limit,
+        'offset': offset,
+    }).mappings()
+    return [dict(row, snippet=highlight(row['snippet'])) for row in rows]
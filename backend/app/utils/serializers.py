@@ -0,0 +1,121 @@
+from operator import attrgetter
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import DateTime
+from sqlalchemy.orm import load_only
+from app.models.note import Note
+from app.models.playbook import Playbook
+from app.models.trade import Trade
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib json module is used without it
+    orjson = None
+
+def format_datetime(value):
+    return value.isoformat() + 'Z' if value is not None else None
+
+class Schema:
+    """Maps a model to its JSON representation.
+
+    `fields` lists the attributes a response may contain and `default`
+    the ones returned when the client does not ask for specific fields.
+    The primary key is always included so clients can address the row.
+    """
+
+    def __init__(self, model, fields, default=None, key='id'):
+        self.model = model
+        self.fields = tuple(fields)
+        self.default = tuple(default or fields)
+        self.key = key
+        self.converters = {}
+        for name in self.fields:
+            column = getattr(model, name)
+            convert = format_datetime if isinstance(column.type, DateTime) else None
+            self.converters[name] = (attrgetter(name), convert)
+
+    def parse_fields(self, value):
+        """Return the field names requested in a comma-separated `fields` value. Raises ValueError."""
+        if not value:
+            return self.default
+        names = [name.strip() for name in value.split(',') if name.strip()]
+        unknown = [name for name in names if name not in self.converters]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}. Valid fields: {', '.join(self.fields)}.")
+        if self.key not in names:
+            names.insert(0, self.key)
+        return tuple(dict.fromkeys(names))
+
+    def load_only(self, names, *extra):
+        """Query option that only SELECTs the columns needed for `names`."""
+        columns = [getattr(self.model, name) for name in names]
+        return load_only(*columns, *extra)
+
+    def dump(self, obj, names=None):
+        output = {}
+        for name in names or self.default:
+            getter, convert = self.converters[name]
+            value = getter(obj)
+            output[name] = convert(value) if convert else value
+        return output
+
+    def dump_many(self, objs, names=None):
+        accessors = [(name, *self.converters[name]) for name in names or self.default]
+        return [
+            {name: convert(getter(obj)) if convert else getter(obj) for name, getter, convert in accessors}
+            for obj in objs
+        ]
+
+class ORJSONProvider(DefaultJSONProvider):
+    """JSON provider backed by orjson, used when it is installed.
+
+    Dates, decimals and the other types Flask knows about still go through
+    DefaultJSONProvider.default, so responses look the same with either backend.
+    """
+
+    def options(self):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return option
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options()).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if args and kwargs:
+            raise TypeError('jsonify() behavior undefined when passed both args and kwargs')
+        obj = args[0] if len(args) == 1 else (args or kwargs)
+        # Skip the str round trip; orjson already produces bytes
+        body = orjson.dumps(obj, default=self.default, option=self.options() | orjson.OPT_APPEND_NEWLINE)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+TRADE_SCHEMA = Schema(Trade, (
+    'id', 'ticker', 'result', 'total_pnl', 'entry_datetime', 'exit_datetime', 'risk_reward',
+    'position', 'stoploss_pips', 'trade_range', 'result_type', 'entry_model', 'trade_model',
+    'setup_type', 'confluences', 'trade_note', 'roadmap', 'screenshot_filename', 'playbook_id'
+))
+
+NOTE_SCHEMA = Schema(Note, ('id', 'title', 'content', 'created_at'))
+
+# The note list never carries the full content; fetch a single note for that
+NOTE_SUMMARY_SCHEMA = Schema(Note, ('id', 'title', 'created_at', 'excerpt'))
+
+PLAYBOOK_SCHEMA = Schema(Playbook, (
+    'playbook_id', 'title', 'entry_model', 'trade_model', 'setup_grade', 'confluences', 'rules',
+    'confirmations', 'invalidations', 'roadmap', 'tags', 'created_at', 'updated_at'
+), key='playbook_id')
+
+# The playbook list has always returned a summary; ask for more with fields=
+PLAYBOOK_SUMMARY_FIELDS = ('playbook_id', 'title', 'entry_model', 'trade_model', 'setup_grade',
+                           'created_at', 'updated_at')
+
+def init_json(app):
+    if app.config['JSON_BACKEND'] == 'orjson' or (app.config['JSON_BACKEND'] == 'auto' and orjson is not None):
+        if orjson is None:
+            raise RuntimeError('JSON_BACKEND is orjson but the orjson package is not installed.')
+        app.json = ORJSONProvider(app)
+        # Key order is irrelevant to clients and sorting costs time on large lists
+        app.json.sort_keys = False
@@ -0,0 +1,77 @@
+import hashlib
+import os
+import re
+import tempfile
+
+HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+)
+
+def is_valid_hash(digest):
+    return bool(HASH_PATTERN.match(digest))
+
+def blob_path(folder, digest, suffix=''):
+    # Two levels of sharding keep directory sizes small: ab/cd/abcd...<suffix>
+    return os.path.join(folder, digest[:2], digest[2:4], digest + suffix)
+
+def store_bytes(folder, data, suffix=''):
+    """Write `data` under its sha256 and return the digest. Identical content is stored once."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = blob_path(folder, digest, suffix)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file first so readers never see a partially written blob
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return digest
+
+def remove_blob(folder, digest, suffix=''):
+    try:
+        os.remove(blob_path(folder, digest, suffix))
+    except FileNotFoundError:
+        pass
+
+def detect_mimetype(head):
+    for signature, mimetype in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mimetype
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
+
+def spool_stream(folder, stream, chunk_size=64 * 1024):
+    """Copy `stream` to a temp file in `folder` while hashing it and return (tmp_path, digest, size).
+
+    Pass the temp file to publish_blob() to move it into place, or remove it.
+    """
+    os.makedirs(folder, exist_ok=True)
+    sha = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=folder)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in iter(lambda: stream.read(chunk_size), b''):
+                sha.update(chunk)
+                f.write(chunk)
+                size += len(chunk)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+    return tmp_path, sha.hexdigest(), size
+
+def publish_blob(folder, tmp_path, digest):
+    """Move a spooled file into place under `digest`.
+
+    Always replaces, never skips on an existing blob: a concurrent delete may
+    be about to unlink the one that is there.
+    """
+    path = blob_path(folder, digest)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    os.replace(tmp_path, path)
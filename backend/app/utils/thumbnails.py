@@ -0,0 +1,79 @@
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from app.utils.storage import blob_path
+
+try:
+    from PIL import Image
+except ImportError:  # Renditions are skipped and originals served when Pillow is missing
+    Image = None
+
+# Longest edge, in pixels, of each generated rendition
+RENDITIONS = {'thumb': 200, 'preview': 800}
+
+def rendition_path(upload_folder, size, key):
+    return blob_path(os.path.join(upload_folder, 'renditions', size), key)
+
+def render(source_path, upload_folder, key):
+    with Image.open(source_path) as original:
+        original.load()
+        for size, edge in RENDITIONS.items():
+            target = rendition_path(upload_folder, size, key)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            image = original.copy()
+            image.thumbnail((edge, edge))
+            if original.format == 'JPEG' and image.mode not in ('RGB', 'L'):
+                image = image.convert('RGB')
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target))
+            with os.fdopen(fd, 'wb') as f:
+                image.save(f, format=original.format, optimize=True)
+            os.replace(tmp_path, target)
+
+def remove_renditions(upload_folder, key):
+    for size in RENDITIONS:
+        try:
+            os.remove(rendition_path(upload_folder, size, key))
+        except FileNotFoundError:
+            pass
+
+class RenditionPool:
+    """Generates renditions on a bounded thread pool so uploads never wait on image resizing."""
+
+    def __init__(self, max_workers, max_pending):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='renditions')
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.pending = set()
+        self.lock = threading.Lock()
+
+    def submit(self, source_path, upload_folder, key):
+        """Queue renditions of `source_path` stored under `key`. Returns False when Pillow is missing or the queue is full."""
+        if Image is None:
+            return False
+        with self.lock:
+            if key in self.pending:
+                return True
+            if not self.slots.acquire(blocking=False):
+                # Saturated: the request that needs the rendition will queue it again later
+                return False
+            self.pending.add(key)
+        future = self.executor.submit(self.run, source_path, upload_folder, key)
+        future.add_done_callback(lambda _: self.release(key))
+        return True
+
+    def run(self, source_path, upload_folder, key):
+        if all(os.path.exists(rendition_path(upload_folder, size, key)) for size in RENDITIONS):
+            return
+        try:
+            render(source_path, upload_folder, key)
+        except (OSError, ValueError):
+            # Not a decodable image; the original is served for every size instead
+            pass
+
+    def release(self, key):
+        with self.lock:
+            self.pending.discard(key)
+        self.slots.release()
+
+def init_renditions(app):
+    app.extensions['renditions'] = RenditionPool(app.config['THUMBNAIL_WORKERS'], app.config['THUMBNAIL_QUEUE_SIZE'])
@@ -0,0 +1,343 @@
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from app import db
+from app.models.trade import Trade
+from app.utils.dates import date_filters
+from app.utils.labels import normalize_labels
+from app.utils.versions import get_version
+
+try:
+    import numpy as np
+except ImportError:  # optional; trades are always read from the database without it
+    np = None
+
+# Each cached user's trades are held column by column. Numbers and datetimes
+# are NumPy arrays; repetitive strings are stored once per distinct value
+# with an int32 code per trade; free text and confluence lists stay Python
+# objects in object arrays.
+NUMBERS = {'id': 'int64', 'total_pnl': 'float64', 'risk_reward': 'float64',
+           'stoploss_pips': 'int64', 'trade_range': 'int64'}
+DATETIMES = ('entry_datetime', 'exit_datetime')
+CATEGORIES = ('ticker', 'result', 'position', 'result_type', 'entry_model', 'trade_model', 'setup_type',
+              'screenshot_filename', 'playbook_id')
+OBJECTS = ('confluences', 'trade_note', 'roadmap')
+FIELDS = tuple(NUMBERS) + DATETIMES + CATEGORIES + OBJECTS
+LOAD_BATCH_SIZE = 10000
+
+def trade_row(trade):
+    """The cached values of a Trade, in FIELDS order. Take it before the commit expires the object."""
+    row = []
+    for name in FIELDS:
+        value = getattr(trade, name)
+        if name in DATETIMES and value.tzinfo is not None:
+            # Stored without an offset, so cache it the way it reads back
+            value = value.replace(tzinfo=None)
+        row.append(value)
+    return tuple(row)
+
+def object_size(value):
+    if value is None:
+        return 0
+    if isinstance(value, list):
+        return sys.getsizeof(value) + sum(sys.getsizeof(item) for item in value)
+    return sys.getsizeof(value)
+
+def format_datetimes(values):
+    # Same text as serializers.format_datetime: microseconds only when there are any
+    seconds = np.datetime_as_string(values, unit='s')
+    micros = np.datetime_as_string(values, unit='us')
+    whole = values.astype(np.int64) % 1_000_000 == 0
+    return [text + 'Z' for text in np.where(whole, seconds, micros).tolist()]
+
+class TradeColumns:
+    """One user's trades as columns, sorted by (entry_datetime, id).
+
+    Instances are never modified: `patch` returns a new one, so a request can
+    keep reading a snapshot while a write replaces it in the cache.
+    """
+
+    numbers, datetimes, categories, objects = NUMBERS, DATETIMES, CATEGORIES, OBJECTS
+    fields = FIELDS
+    # Whether every trade field is held, so the columns can answer the trade list
+    complete = True
+
+    def __init__(self, arrays, lookups):
+        self.arrays = arrays
+        # Per category, value -> code in insertion order, so list(lookup)[code] is the value
+        self.lookups = lookups
+        self.values = {name: np.fromiter(lookup, dtype=object, count=len(lookup)) for name, lookup in lookups.items()}
+        self.size = len(arrays['id'])
+        self.nbytes = (sum(array.nbytes for array in arrays.values()) + int(arrays['object_bytes'].sum())
+                       + sum(object_size(value) for lookup in lookups.values() for value in lookup))
+        self._labels = None
+
+    @classmethod
+    def from_trade_row(cls, row):
+        """A `trade_row` tuple reduced to this class's fields."""
+        return row
+
+    @classmethod
+    def build_arrays(cls, rows, lookups):
+        columns = dict(zip(cls.fields, zip(*rows))) if rows else dict.fromkeys(cls.fields, ())
+        count = len(rows)
+        arrays = {name: np.array(columns[name], dtype=dtype) for name, dtype in cls.numbers.items()}
+        for name in cls.datetimes:
+            arrays[name] = np.array(columns[name], dtype='datetime64[us]')
+        for name in cls.categories:
+            lookup = lookups[name]
+            for value in dict.fromkeys(columns[name]):
+                lookup.setdefault(value, len(lookup))
+            arrays[name] = np.fromiter(map(lookup.__getitem__, columns[name]), dtype=np.int32, count=count)
+        for name in cls.objects:
+            arrays[name] = np.fromiter(columns[name], dtype=object, count=count)
+        arrays['object_bytes'] = np.fromiter(
+            (sum(object_size(value) for value in values) for values in zip(*(columns[name] for name in cls.objects))),
+            dtype=np.int64, count=count) if cls.objects else np.zeros(count, dtype=np.int64)
+        return arrays
+
+    @classmethod
+    def from_batches(cls, batches):
+        """Build from batches of tuples in `fields` order that are already sorted by (entry_datetime, id)."""
+        lookups = {name: {} for name in cls.categories}
+        parts = [cls.build_arrays(batch, lookups) for batch in batches] or [cls.build_arrays([], lookups)]
+        return cls({name: np.concatenate([part[name] for part in parts]) for name in parts[0]}, lookups)
+
+    def patch(self, upserts=(), deleted=()):
+        """Return a copy with the trades in `deleted` removed and the rows in `upserts` inserted or replaced."""
+        lookups = {name: dict(lookup) for name, lookup in self.lookups.items()}
+        upserts = [self.from_trade_row(row) for row in upserts]
+        entry = self.fields.index('entry_datetime')
+        added = self.build_arrays(sorted(upserts, key=lambda row: (row[entry], row[0])), lookups)
+        replaced = np.concatenate((added['id'], np.asarray(deleted, dtype=np.int64)))
+        removed = np.flatnonzero(np.isin(self.arrays['id'], replaced))
+        arrays = self.arrays
+        if len(removed):
+            arrays = {name: np.delete(array, removed) for name, array in arrays.items()}
+        if len(added['id']):
+            # Insert each new row at its (entry_datetime, id) position instead of sorting everything again
+            entries, ids = arrays['entry_datetime'], arrays['id']
+            first = np.searchsorted(entries, added['entry_datetime'], side='left')
+            last = np.searchsorted(entries, added['entry_datetime'], side='right')
+            positions = [start + np.searchsorted(ids[start:end], trade_id)
+                         for start, end, trade_id in zip(first.tolist(), last.tolist(), added['id'].tolist())]
+            arrays = {name: np.insert(array, positions, added[name]) for name, array in arrays.items()}
+        return type(self)(arrays, lookups)
+
+    def column(self, name, rows):
+        return self.arrays[name][rows]
+
+    def equals(self, name, value, rows=None):
+        """Mask of the trades (or of `rows`) whose category column `name` equals `value`."""
+        codes = self.arrays[name] if rows is None else self.arrays[name][rows]
+        code = self.lookups[name].get(value)
+        return codes == code if code is not None else np.zeros(len(codes), dtype=bool)
+
+    def label_mask(self, label):
+        # Built on first use per snapshot; confluence filters are rare next to the others
+        if self._labels is None:
+            index = {}
+            for row, confluences in enumerate(self.arrays['confluences'].tolist()):
+                for name in normalize_labels(confluences):
+                    index.setdefault(name, []).append(row)
+            self._labels = {name: np.array(rows, dtype=np.int64) for name, rows in index.items()}
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self._labels.get(label, [])] = True
+        return mask
+
+    def can_select(self, args, equal_fields):
+        """Whether the columns held are enough to apply the list filters in `args`."""
+        return all(name in self.lookups for name in equal_fields if args.get(name)) \
+            and (not args.get('confluence') or 'confluences' in self.arrays)
+
+    def select(self, args, equal_fields):
+        """Indexes of the trades matching the list filters in `args`, in list order. Raises ValueError."""
+        mask = np.ones(self.size, dtype=bool)
+        for predicate in date_filters(self.arrays['entry_datetime'], args):
+            mask &= predicate
+        for name in equal_fields:
+            if args.get(name):
+                mask &= self.equals(name, args[name])
+        if args.get('confluence'):
+            mask &= self.label_mask(args['confluence'])
+        return np.flatnonzero(mask)
+
+    def after(self, rows, entry_datetime, trade_id):
+        """The part of `rows` that comes after the (entry_datetime, id) cursor."""
+        entries, ids = self.arrays['entry_datetime'][rows], self.arrays['id'][rows]
+        return rows[(entries > entry_datetime) | ((entries == entry_datetime) & (ids > trade_id))]
+
+    def key(self, row):
+        """The (entry_datetime, id) cursor of one row."""
+        return self.arrays['entry_datetime'][row].astype(object), int(self.arrays['id'][row])
+
+    def values_of(self, name, rows):
+        if name in CATEGORIES:
+            return self.values[name][self.arrays[name][rows]].tolist()
+        if name in DATETIMES:
+            return format_datetimes(self.arrays[name][rows])
+        return self.arrays[name][rows].tolist()
+
+    def dump(self, rows, names):
+        """The same dicts TRADE_SCHEMA.dump_many would return for these rows."""
+        columns = [self.values_of(name, rows) for name in names]
+        return [dict(zip(names, values)) for values in zip(*columns)]
+
+class AnalyticsColumns(TradeColumns):
+    """Only the columns GET /trades/analytics reads, for users with too many
+    trades to hold whole. About 40 bytes per trade; they can answer analytics
+    filtered by date and result, but not the trade list."""
+
+    numbers = {'id': 'int64', 'total_pnl': 'float64', 'risk_reward': 'float64'}
+    datetimes, categories, objects = ('entry_datetime',), ('result',), ()
+    fields = tuple(numbers) + datetimes + categories + objects
+    complete = False
+    positions = [FIELDS.index(name) for name in fields]
+
+    @classmethod
+    def from_trade_row(cls, row):
+        return tuple(row[position] for position in cls.positions)
+
+class TradeCache:
+    """Process-local LRU of TradeColumns per user, bounded by their total size in bytes.
+
+    Entries remember the user's data version they were loaded at. A lookup
+    that finds an older version loads again, so writes made by another
+    process, or by a path that doesn't patch the cache, are never served.
+    Loads run on a background thread; the request that missed, and any
+    others until the load finishes, read from the database as before.
+    Users with more than `max_trades` trades get AnalyticsColumns instead.
+    """
+
+    def __init__(self, maxbytes, max_trades):
+        self.maxbytes = maxbytes
+        self.max_trades = max_trades
+        self.counts = dict.fromkeys(('hits', 'misses', 'loads', 'patches', 'evictions'), 0)
+        self.bytes = 0
+        # user_id -> (version, TradeColumns, AnalyticsColumns, or None when the user is too large to cache)
+        self.entries = OrderedDict()
+        self.loading = set()
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trade-cache')
+        self.lock = threading.Lock()
+
+    @property
+    def enabled(self):
+        return np is not None and self.maxbytes > 0
+
+    def lookup(self, user_id, analytics=False):
+        """Return the user's cached trades, or None to read from the database. A miss queues a load.
+
+        AnalyticsColumns are only returned when `analytics` is true.
+        """
+        if not self.enabled:
+            return None
+        version = get_version(user_id)
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] == version:
+                self.entries.move_to_end(user_id)
+                columns = entry[1]
+                if columns is not None and not (columns.complete or analytics):
+                    columns = None
+                self.counts['hits' if columns is not None else 'misses'] += 1
+                return columns
+            self.counts['misses'] += 1
+            if user_id in self.loading:
+                return None
+            self.loading.add(user_id)
+        self.executor.submit(self.run_load, current_app._get_current_object(), user_id)
+        return None
+
+    def run_load(self, app, user_id):
+        try:
+            with app.app_context():
+                # Read first: a write landing during the load can only make the entry stale
+                version = get_version(user_id)
+                self.store(user_id, version, self.load(user_id))
+        except Exception:
+            app.logger.exception('Could not load the trades of user %s into the cache', user_id)
+        finally:
+            with self.lock:
+                self.loading.discard(user_id)
+
+    def load(self, user_id):
+        count = db.session.query(db.func.count(Trade.id)).filter(Trade.user_id == user_id).scalar()
+        columns_class = TradeColumns if count <= self.max_trades else AnalyticsColumns
+        statement = db.select(*[getattr(Trade, name) for name in columns_class.fields]) \
+            .where(Trade.user_id == user_id) \
+            .order_by(Trade.entry_datetime.asc(), Trade.id.asc()).execution_options(yield_per=LOAD_BATCH_SIZE)
+        columns = columns_class.from_batches(db.session.execute(statement).partitions())
+        with self.lock:
+            self.counts['loads'] += 1
+        return columns if columns.nbytes <= self.maxbytes else None
+
+    def store(self, user_id, version, columns):
+        with self.lock:
+            self.remove(user_id)
+            self.entries[user_id] = (version, columns)
+            self.bytes += columns.nbytes if columns is not None else 0
+            while self.bytes > self.maxbytes:
+                evicted = next(iter(self.entries))
+                self.remove(evicted)
+                self.counts['evictions'] += 1
+
+    def remove(self, user_id):
+        entry = self.entries.pop(user_id, None)
+        if entry is not None and entry[1] is not None:
+            self.bytes -= entry[1].nbytes
+
+    def apply(self, user_id, upserts=(), deleted=()):
+        """Bring the user's entry up to date after a committed write.
+
+        Call once per commit that bumped the version, with the trade rows
+        (from `trade_row`) it inserted or updated and the ids it deleted;
+        writes that leave trades alone pass neither. The entry is patched
+        only if it was current just before this write, and dropped otherwise.
+        """
+        if not self.enabled:
+            return
+        version = get_version(user_id)
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return
+            if entry[0] != version - 1 or entry[1] is None:
+                self.remove(user_id)
+                return
+        columns = entry[1].patch(upserts, deleted) if upserts or deleted else entry[1]
+        with self.lock:
+            # Another request may have replaced the entry while this one patched
+            if self.entries.get(user_id) is not entry:
+                return
+            self.bytes += columns.nbytes - entry[1].nbytes
+            self.entries[user_id] = (version, columns)
+            self.counts['patches'] += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self.lock:
+            lookups = self.counts['hits'] + self.counts['misses']
+            cached = [entry[1] for entry in self.entries.values() if entry[1] is not None]
+            return dict(
+                self.counts,
+                enabled=self.enabled,
+                users=len(cached),
+                analytics_only_users=sum(not columns.complete for columns in cached),
+                trades=sum(columns.size for columns in cached),
+                bytes=self.bytes,
+                maxbytes=self.maxbytes,
+                max_trades=self.max_trades,
+                hit_rate=round(self.counts['hits'] / lookups, 4) if lookups else 0.0,
+            )
+
+def trade_cache():
+    return current_app.extensions['trade_cache']
+
+def init_trade_cache(app):
+    app.extensions['trade_cache'] = TradeCache(app.config['TRADE_CACHE_SIZE'], app.config['TRADE_CACHE_MAX_TRADES'])
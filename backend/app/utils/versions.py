@@ -0,0 +1,49 @@
+import hashlib
+from functools import wraps
+from flask import request, make_response
+from app import db
+from app.models.data_version import DataVersion
+
+# Read endpoints are revalidated against a per-user data version instead of
+# the rows themselves: any write bumps the version, so an ETag built from it
+# (plus the request URL) stays valid exactly as long as the response would.
+
+def get_version(user_id):
+    return db.session.query(DataVersion.version).filter_by(user_id=user_id).scalar() or 0
+
+def bump_version(user_id):
+    """Increment the user's data version in the current transaction."""
+    result = db.session.execute(
+        db.update(DataVersion).where(DataVersion.user_id == user_id).values(version=DataVersion.version + 1)
+    )
+    if result.rowcount == 0:
+        db.session.add(DataVersion(user_id=user_id, version=1))
+
+def version_etag(user_id, version):
+    args = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    raw = f'{user_id}:{version}:{request.path}?{args}'
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+def versioned(f):
+    """Answer If-None-Match with 304 when the user's data hasn't changed.
+
+    Goes below @token_required; the view only runs when the ETag doesn't match.
+    """
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        # The version is read first, so a write landing while the view runs
+        # can only make the ETag stale, never make it claim newer data
+        etag = version_etag(current_user.id, get_version(current_user.id))
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            response = make_response(f(current_user, *args, **kwargs))
+            if response.status_code != 200:
+                return response
+        response.set_etag(etag)
+        # Cache privately but revalidate on every use, so writes show up at once
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        return response
+
+    return decorated
@@ -0,0 +1,136 @@
+"""Benchmark suite.
+
+    python -m bench generate --size 100k --data-dir /tmp/tradenote-bench
+    python -m bench run --size 10k --output before.json
+    python -m bench run --server http://127.0.0.1:5000 --concurrency 8 --output server.json
+    python -m bench compare before.json after.json
+
+Run from the backend/ directory. See README.md for details.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+SIZES = {'10k': 10_000, '100k': 100_000, '1m': 1_000_000}
+
+def use_data_dir(path):
+    # Must happen before anything imports the app; the config reads it at import time
+    os.environ['TRADENOTE_DATA_DIR'] = path
+
+def load_app():
+    from app import create_app, db
+    from app.config import Config
+    from app.utils.engine import sqlite_database_path
+    # Never seed or write to a real journal because the config was read before
+    # use_data_dir() or DATABASE_URL points elsewhere
+    url = Config.SQLALCHEMY_DATABASE_URI
+    data_dir = os.path.realpath(os.environ['TRADENOTE_DATA_DIR'])
+    db_path = sqlite_database_path(url)
+    if not db_path or os.path.commonpath([data_dir, os.path.realpath(db_path)]) != data_dir:
+        raise SystemExit(f'The database {url} is not under {data_dir}; unset DATABASE_URL to benchmark.')
+    return create_app(), db
+
+def parse_size(value):
+    key = value.lower()
+    if key in SIZES:
+        return SIZES[key]
+    try:
+        return int(key)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"size must be one of {', '.join(SIZES)} or a row count")
+
+def generate_command(args):
+    use_data_dir(args.data_dir)
+    app, _ = load_app()
+    from bench.datagen import generate
+    with app.app_context():
+        dataset = generate(args.size, users=args.users, seed=args.seed)
+    print(json.dumps(dataset))
+
+def run_command(args):
+    log = (lambda line: print(line, file=sys.stderr)) if not args.quiet else None
+    if args.server:
+        from bench.runner import run
+        from bench.clients import HttpClient
+        client = HttpClient(args.server, args.concurrency, args.server_pid)
+        report = run(client, args.iterations, not args.read_only, args.only, log)
+        report['dataset'] = None
+    else:
+        use_data_dir(args.data_dir or tempfile.mkdtemp(prefix='tradenote-bench-'))
+        app, db = load_app()
+        # bench.runner imports the app through bench.datagen, so only after use_data_dir
+        from bench.runner import run
+        from bench.clients import InProcessClient
+        from bench.datagen import generate, has_bench_data
+        with app.app_context():
+            dataset = None
+            if not has_bench_data():
+                dataset = generate(args.size, users=args.users, seed=args.seed)
+                if log:
+                    log(f'Generated {dataset}')
+            client = InProcessClient(app, db.engine)
+        report = run(client, args.iterations, not args.read_only, args.only, log)
+        report['dataset'] = dataset
+    report['data_dir'] = os.environ.get('TRADENOTE_DATA_DIR')
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+def compare_command(args):
+    from bench.runner import compare
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    regressions = 0
+    for name, metric, before, after, change, regressed in compare(old, new, args.threshold):
+        regressions += regressed
+        marker = '  REGRESSION' if regressed else ''
+        print(f'{name:<28} {metric:<7} {before:>10.3f} -> {after:>10.3f} ms  {change:+7.1f}%{marker}')
+    if regressions:
+        print(f'{regressions} metric(s) slower by more than {args.threshold}%')
+        raise SystemExit(1)
+
+def main():
+    parser = argparse.ArgumentParser(prog='python -m bench', description='TradeNote benchmark suite')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    def dataset_options(command):
+        command.add_argument('--size', type=parse_size, default='10k', help='10k, 100k, 1m or a number of trades')
+        command.add_argument('--users', type=int, default=4, help='Users to spread the trades over')
+        command.add_argument('--seed', type=int, default=1)
+
+    generate = commands.add_parser('generate', help='Fill a data directory with synthetic data')
+    generate.add_argument('--data-dir', required=True)
+    dataset_options(generate)
+    generate.set_defaults(handler=generate_command)
+
+    run = commands.add_parser('run', help='Time every endpoint and print a JSON report')
+    dataset_options(run)
+    run.add_argument('--data-dir', help='Reuse (or fill) this data directory instead of a temporary one')
+    run.add_argument('--server', help='Base URL of a running server to benchmark instead of the test client')
+    run.add_argument('--concurrency', type=int, default=1, help='Concurrent requests with --server')
+    run.add_argument('--server-pid', type=int, help="Report this process's peak RSS with --server")
+    run.add_argument('--iterations', type=int, default=50, help='Requests per scenario')
+    run.add_argument('--read-only', action='store_true', help='Skip the scenarios that write data')
+    run.add_argument('--only', nargs='+', help='Only run scenarios whose name starts with one of these')
+    run.add_argument('--output', help='Write the report here instead of stdout')
+    run.add_argument('--quiet', action='store_true', help='Do not log progress to stderr')
+    run.set_defaults(handler=run_command)
+
+    compare = commands.add_parser('compare', help='Compare the latencies in two reports')
+    compare.add_argument('old')
+    compare.add_argument('new')
+    compare.add_argument('--threshold', type=float, default=10.0, help='Percent slowdown reported as a regression')
+    compare.set_defaults(handler=compare_command)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+if __name__ == '__main__':
+    main()
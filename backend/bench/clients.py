@@ -0,0 +1,102 @@
+import json
+import os
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import event
+
+class Request:
+    def __init__(self, method, path, headers=None, json=None, form=None, body=None, content_type=None):
+        self.method = method
+        self.path = path
+        self.headers = dict(headers or {})
+        self.json = json
+        self.form = form
+        self.body = body
+        self.content_type = content_type
+
+class Response:
+    def __init__(self, status, body, headers):
+        self.status = status
+        self.body = body
+        self.headers = headers
+
+    def json(self):
+        return json.loads(self.body)
+
+class InProcessClient:
+    """Drives the app through Flask's test client and counts the SQL statements each request runs."""
+
+    concurrency = 1
+
+    def __init__(self, app, engine):
+        self.client = app.test_client()
+        self.queries = 0
+        event.listen(engine, 'before_cursor_execute', self.count_query)
+
+    def count_query(self, *args):
+        self.queries += 1
+
+    def send(self, request):
+        kwargs = {'headers': request.headers}
+        if request.json is not None:
+            kwargs['json'] = request.json
+        elif request.form is not None:
+            kwargs['data'] = request.form
+        elif request.body is not None:
+            kwargs['data'] = request.body
+            kwargs['content_type'] = request.content_type
+        response = self.client.open(request.path, method=request.method, **kwargs)
+        return Response(response.status_code, response.get_data(), response.headers)
+
+    def peak_rss_kib(self):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+class HttpClient:
+    """Drives a running server over HTTP, `concurrency` requests at a time.
+
+    SQL statements can't be counted from outside the server, so `queries`
+    stays None. Pass the server's pid to report its peak RSS.
+    """
+
+    queries = None
+
+    def __init__(self, base_url, concurrency=1, server_pid=None):
+        self.base_url = base_url.rstrip('/')
+        self.concurrency = concurrency
+        self.server_pid = server_pid
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def send(self, request):
+        headers = dict(request.headers)
+        data = None
+        if request.json is not None:
+            data = json.dumps(request.json).encode()
+            headers['Content-Type'] = 'application/json'
+        elif request.form is not None:
+            data = urllib.parse.urlencode(request.form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif request.body is not None:
+            data = request.body
+            headers['Content-Type'] = request.content_type
+        http_request = urllib.request.Request(self.base_url + request.path, data=data, headers=headers,
+                                              method=request.method)
+        try:
+            with urllib.request.urlopen(http_request) as response:
+                return Response(response.status, response.read(), response.headers)
+        except urllib.error.HTTPError as e:
+            return Response(e.code, e.read(), e.headers)
+
+    def map(self, fn, items):
+        return list(self.executor.map(fn, items))
+
+    def peak_rss_kib(self):
+        if self.server_pid is None:
+            return None
+        with open(os.path.join('/proc', str(self.server_pid), 'status')) as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+        return None
@@ -0,0 +1,206 @@
+import csv
+import os
+import random
+import struct
+import time
+import uuid
+import zlib
+from datetime import date, datetime, timedelta
+from flask import current_app
+from app import db
+from app.models.note import Note
+from app.models.playbook import Playbook
+from app.models.screenshot import Screenshot
+from app.models.trade import Trade
+from app.models.user import User
+from app.utils.labels import rebuild_labels
+from app.utils.passwords import password_hasher
+from app.utils.rollups import rebuild_rollups
+from app.utils.storage import store_bytes
+
+USERNAME_PREFIX = 'bench'
+PASSWORD = 'bench-password'
+INSERT_BATCH_SIZE = 5000
+
+TICKERS = ('EURUSD', 'GBPUSD', 'USDJPY', 'XAUUSD', 'NAS100', 'US30', 'AAPL', 'TSLA', 'NVDA', 'SPY')
+ENTRY_MODELS = ('Breakout', 'Pullback', 'Reversal', 'Liquidity Sweep')
+TRADE_MODELS = ('Scalp', 'Intraday', 'Swing')
+SETUP_GRADES = ('A+', 'A', 'B', 'C')
+CONFLUENCES = ('EMA Cross', 'Volume Spike', 'RSI Divergence', 'Order Block', 'Fair Value Gap',
+               'Session Open', 'HTF Trend', 'Support', 'Resistance', 'News')
+WORDS = ('price', 'level', 'entry', 'stop', 'target', 'trend', 'volume', 'session', 'london', 'new',
+         'york', 'breakout', 'pullback', 'patience', 'risk', 'plan', 'execution', 'liquidity', 'sweep',
+         'range', 'candle', 'close', 'open', 'high', 'low', 'retest', 'momentum', 'news', 'mistake', 'rule')
+EVENT_TYPES = ('earnings', 'data', 'speech')
+
+def png_bytes(width, height, rgb):
+    """A solid-colour PNG, built by hand so the generator does not need Pillow."""
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+    row = b'\x00' + bytes(rgb) * width
+    return (b'\x89PNG\r\n\x1a\n'
+            + chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+            + chunk(b'IDAT', zlib.compress(row * height))
+            + chunk(b'IEND', b''))
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+def paragraph(rng, sentences):
+    return ' '.join(sentence(rng, rng.randint(6, 14)) for _ in range(sentences))
+
+def insert_batches(model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.session.execute(model.__table__.insert(), batch)
+            batch = []
+    if batch:
+        db.session.execute(model.__table__.insert(), batch)
+
+def split(total, parts):
+    return [total // parts + (1 if i < total % parts else 0) for i in range(parts)]
+
+def create_users(count):
+    # One real hash shared by every user; hashing is deliberately slow
+    password = password_hasher().hash(PASSWORD)
+    avatar = store_bytes(current_app.config['AVATAR_FOLDER'], png_bytes(64, 64, (40, 120, 200)))
+    db.session.execute(User.__table__.insert(), [
+        {'username': f'{USERNAME_PREFIX}{i}', 'password': password, 'avatar_hash': avatar} for i in range(count)
+    ])
+    prefix_length = len(USERNAME_PREFIX)
+    rows = db.session.query(User.id, User.username).filter(User.username.like(f'{USERNAME_PREFIX}%')).all()
+    return [user_id for user_id, username in sorted(rows, key=lambda row: int(row.username[prefix_length:]))]
+
+def create_screenshots(rng, count):
+    filenames = []
+    for i in range(count):
+        data = png_bytes(320, 200, (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+        digest = store_bytes(current_app.config['UPLOAD_FOLDER'], data)
+        db.session.add(Screenshot(hash=digest, size=len(data), ref_count=0))
+        filenames.append(f'{digest}.png')
+    return filenames
+
+def playbook_rows(rng, user_id):
+    rows = []
+    for entry_model in ENTRY_MODELS:
+        for trade_model in TRADE_MODELS:
+            rows.append({
+                'playbook_id': f'pb_{uuid.UUID(int=rng.getrandbits(128)).hex[:8]}',
+                'title': f'{entry_model} {trade_model}',
+                'entry_model': entry_model,
+                'trade_model': trade_model,
+                'setup_grade': rng.choice(SETUP_GRADES),
+                'confluences': rng.sample(CONFLUENCES, 3),
+                'rules': [sentence(rng, 10) for _ in range(4)],
+                'confirmations': [sentence(rng, 8) for _ in range(2)],
+                'invalidations': [sentence(rng, 8) for _ in range(2)],
+                'roadmap': [sentence(rng, 6) for _ in range(3)],
+                'tags': rng.sample(('trend', 'range', 'intraday', 'swing', 'news', 'session'), 2),
+                'created_at': datetime(2023, 1, 1),
+                'updated_at': datetime(2023, 1, 1),
+                'user_id': user_id,
+            })
+    return rows
+
+def trade_rows(rng, user_id, count, start, playbooks, screenshots, counts):
+    minutes = 3 * 365 * 24 * 60
+    for _ in range(count):
+        entry = start + timedelta(minutes=rng.randrange(minutes))
+        outcome = rng.random()
+        result = 'Win' if outcome < 0.45 else 'Loss' if outcome < 0.9 else 'Breakeven'
+        risk = rng.choice((50, 100, 150, 200))
+        risk_reward = round(rng.uniform(0.5, 4.0), 2) if result == 'Win' else -1.0 if result == 'Loss' else 0.0
+        playbook = rng.choice(playbooks)
+        screenshot = rng.choice(screenshots) if rng.random() < 0.05 else None
+        if screenshot:
+            counts[screenshot] += 1
+        yield {
+            'ticker': rng.choice(TICKERS),
+            'result': result,
+            'total_pnl': round(risk * risk_reward, 2),
+            'entry_datetime': entry,
+            'exit_datetime': entry + timedelta(minutes=rng.randint(5, 600)),
+            'risk_reward': risk_reward,
+            'position': rng.choice(('Long', 'Short')),
+            'stoploss_pips': rng.randint(5, 60),
+            'trade_range': rng.randint(20, 300),
+            'result_type': {'Win': 'Good Win', 'Loss': 'Good Loss', 'Breakeven': 'Breakeven'}[result],
+            'entry_model': playbook['entry_model'],
+            'trade_model': playbook['trade_model'],
+            'setup_type': rng.choice(SETUP_GRADES),
+            'confluences': rng.sample(CONFLUENCES, rng.randint(0, 4)),
+            'trade_note': paragraph(rng, rng.randint(1, 4)) if rng.random() < 0.6 else None,
+            'roadmap': paragraph(rng, 1) if rng.random() < 0.3 else None,
+            'screenshot_filename': screenshot,
+            'playbook_id': playbook['playbook_id'] if rng.random() < 0.3 else None,
+            'user_id': user_id,
+        }
+
+def note_rows(rng, user_id, count, start):
+    minutes = 3 * 365 * 24 * 60
+    for _ in range(count):
+        yield {
+            'title': sentence(rng, rng.randint(2, 6))[:100],
+            'content': '\n\n'.join(paragraph(rng, rng.randint(2, 6)) for _ in range(rng.randint(1, 5))),
+            'created_at': start + timedelta(minutes=rng.randrange(minutes)),
+            'user_id': user_id,
+        }
+
+def write_events(rng, folder, start, days):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, 'bench.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(('date', 'time', 'type', 'symbol', 'details'))
+        for offset in range(days):
+            day = start + timedelta(days=offset)
+            for _ in range(rng.randint(0, 6)):
+                event_type = rng.choice(EVENT_TYPES)
+                symbol = rng.choice(TICKERS) if event_type == 'earnings' else ''
+                writer.writerow((day.isoformat(), f'{rng.randint(0, 23):02d}:{rng.choice((0, 30)):02d}',
+                                 event_type, symbol, sentence(rng, 5)))
+
+def has_bench_data():
+    return db.session.query(User.id).filter_by(username=f'{USERNAME_PREFIX}0').first() is not None
+
+def generate(trades, users=4, seed=1, screenshots=8):
+    """Fill the current app's database with synthetic journal data.
+
+    `trades` rows are spread evenly over `users` users named bench0, bench1,
+    and so on, with one note per ten trades and a playbook for every entry
+    and trade model combination. Returns the row counts and elapsed seconds.
+    """
+    if has_bench_data():
+        raise RuntimeError('The database already holds benchmark data.')
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 2)
+
+    user_ids = create_users(users)
+    filenames = create_screenshots(rng, screenshots)
+    counts = dict.fromkeys(filenames, 0)
+    playbook_count = 0
+    for user_id, trade_count in zip(user_ids, split(trades, users)):
+        playbooks = playbook_rows(rng, user_id)
+        insert_batches(Playbook, playbooks)
+        playbook_count += len(playbooks)
+        insert_batches(Trade, trade_rows(rng, user_id, trade_count, start, playbooks, filenames, counts))
+        insert_batches(Note, note_rows(rng, user_id, trade_count // 10, start))
+        db.session.commit()
+    for filename, count in counts.items():
+        db.session.get(Screenshot, filename.split('.', 1)[0]).ref_count = count
+    db.session.commit()
+
+    # Derived tables are rebuilt once at the end instead of row by row
+    rebuild_rollups()
+    rebuild_labels()
+    write_events(rng, current_app.config['EVENTS_FOLDER'], date(2023, 1, 1), 4 * 365)
+    return {
+        'users': users,
+        'trades': trades,
+        'notes': sum(count // 10 for count in split(trades, users)),
+        'playbooks': playbook_count,
+        'screenshots': screenshots,
+        'seconds': round(time.perf_counter() - started, 2),
+    }
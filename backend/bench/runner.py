@@ -0,0 +1,95 @@
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from bench.scenarios import SCENARIOS, Context
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_scenario(client, ctx, scenario, iterations):
+    n = min(iterations, scenario.limit) if scenario.limit else iterations
+    requests = scenario.build(ctx, n)
+    latencies = []
+    errors = 0
+
+    def timed(request):
+        started = time.perf_counter()
+        response = client.send(request)
+        return time.perf_counter() - started, response.status
+
+    queries_before = client.queries
+    started = time.perf_counter()
+    if client.concurrency > 1:
+        results = client.map(timed, requests)
+    else:
+        results = [timed(request) for request in requests]
+    elapsed = time.perf_counter() - started
+    for latency, status in results:
+        latencies.append(latency)
+        if status not in scenario.expect:
+            errors += 1
+    latencies.sort()
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'name': scenario.name,
+        'requests': len(requests),
+        'errors': errors,
+        'p50_ms': ms(percentile(latencies, 0.50)),
+        'p95_ms': ms(percentile(latencies, 0.95)),
+        'p99_ms': ms(percentile(latencies, 0.99)),
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'throughput_rps': round(len(requests) / elapsed, 2) if elapsed > 0 and requests else None,
+        'queries_per_request': round((client.queries - queries_before) / len(requests), 2)
+                               if client.queries is not None and requests else None,
+    }
+
+def run(client, iterations=50, writes=True, only=None, log=None):
+    """Run every scenario against `client` and return the report as a dict."""
+    ctx = Context(client)
+    results = []
+    for scenario in SCENARIOS:
+        if (scenario.writes and not writes) or (only and not any(scenario.name.startswith(p) for p in only)):
+            continue
+        result = run_scenario(client, ctx, scenario, iterations)
+        results.append(result)
+        if log:
+            log(f"{result['name']:<28} n={result['requests']:<4} p50={result['p50_ms']}ms "
+                f"p99={result['p99_ms']}ms errors={result['errors']}")
+    return {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'iterations': iterations,
+        'concurrency': client.concurrency,
+        'peak_rss_kib': client.peak_rss_kib(),
+        'scenarios': results,
+    }
+
+def compare(old, new, threshold):
+    """Yield (name, metric, old, new, change %, regressed) for the latency percentiles of both reports."""
+    previous = {result['name']: result for result in old['scenarios']}
+    for result in new['scenarios']:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        for metric in ('p50_ms', 'p95_ms', 'p99_ms'):
+            if not before[metric] or result[metric] is None:
+                continue
+            change = (result[metric] - before[metric]) / before[metric] * 100
+            yield result['name'], metric, before[metric], result[metric], round(change, 1), change > threshold
@@ -0,0 +1,176 @@
+import base64
+import json
+import uuid
+from collections import namedtuple
+from bench.clients import Request
+from bench.datagen import PASSWORD, USERNAME_PREFIX, png_bytes
+
+# `build(ctx, n)` returns the requests to time. `limit` caps n for endpoints
+# that are slow by design, and `writes` marks scenarios that change data.
+Scenario = namedtuple('Scenario', ['name', 'build', 'expect', 'limit', 'writes'], defaults=((200,), None, False))
+
+BENCH_TICKER = 'BENCHW'
+
+class Context:
+    """Authenticates as bench0 and samples ids to request from its data."""
+
+    def __init__(self, client):
+        self.client = client
+        credentials = base64.b64encode(f'{USERNAME_PREFIX}0:{PASSWORD}'.encode()).decode()
+        self.basic_auth = {'Authorization': f'Basic {credentials}'}
+        response = client.send(Request('POST', '/auth/login', self.basic_auth))
+        if response.status != 200:
+            raise RuntimeError('Could not log in as bench0; generate the data first.')
+        self.auth = {'Authorization': f"Bearer {response.json()['token']}"}
+        self.user = self.get('/auth/user')
+        trades = self.get('/trades/?limit=500&fields=id,entry_datetime,screenshot_filename')['trades']
+        self.trade_ids = [trade['id'] for trade in trades]
+        self.month = trades[len(trades) // 2]['entry_datetime'][:7]
+        self.screenshots = [trade['screenshot_filename'] for trade in trades if trade['screenshot_filename']]
+        self.note_ids = [note['id'] for note in self.get('/notes/?fields=id')['notes']][:500]
+        self.playbook_ids = [playbook['playbook_id'] for playbook in self.get('/playbooks/')['playbooks']]
+
+    def get(self, path):
+        response = self.client.send(Request('GET', path, self.auth))
+        if response.status != 200:
+            raise RuntimeError(f'GET {path} returned {response.status}')
+        return response.json()
+
+    def pick(self, values, i):
+        return values[i % len(values)]
+
+    def bench_trade_ids(self):
+        return [trade['id'] for trade in self.get(f'/trades/?ticker={BENCH_TICKER}&fields=id')['trades']]
+
+    def bench_note_ids(self):
+        return [note['id'] for note in self.get('/notes/?fields=id,title')['notes'] if note['title'] == BENCH_TICKER]
+
+    def bench_playbook_ids(self):
+        playbooks = self.get('/playbooks/')['playbooks']
+        return [playbook['playbook_id'] for playbook in playbooks if playbook['title'] == BENCH_TICKER]
+
+def get(path, headers=None):
+    return lambda ctx, n: [Request('GET', path(ctx, i) if callable(path) else path, headers or ctx.auth)
+                           for i in range(n)]
+
+def trade_form(ctx, i):
+    return {
+        'ticker': BENCH_TICKER, 'result': 'Win', 'total_pnl': '125.5',
+        'entry_datetime': f'{ctx.month}-15T09:30:00Z', 'exit_datetime': f'{ctx.month}-15T10:45:00Z',
+        'risk_reward': '2.5', 'position': 'Long', 'stoploss_pips': '12', 'range': '80',
+        'result_type': 'Good Win', 'entry_model': 'Breakout', 'trade_model': 'Intraday', 'setup_type': 'A',
+        'confluences': json.dumps(['EMA Cross', 'Session Open']), 'trade_note': f'Benchmark trade {i}',
+    }
+
+def import_body(ctx, i):
+    rows = []
+    for j in range(10):
+        row = trade_form(ctx, i * 10 + j)
+        row['confluences'] = json.loads(row['confluences'])
+        rows.append(json.dumps(row))
+    return '\n'.join(rows).encode()
+
+def conditional_trades(ctx, n):
+    response = ctx.client.send(Request('GET', '/trades/?limit=100', ctx.auth))
+    headers = dict(ctx.auth, **{'If-None-Match': response.headers['ETag']})
+    return [Request('GET', '/trades/?limit=100', headers) for _ in range(n)]
+
+def batch(ctx, n):
+    body = {'requests': [
+        {'path': '/auth/user'},
+        {'path': '/trades/stats'},
+        {'path': '/trades/', 'query': {'month': ctx.month, 'fields': 'id,ticker,total_pnl,entry_datetime'}},
+    ]}
+    return [Request('POST', '/batch', ctx.auth, json=body) for _ in range(n)]
+
+def register(ctx, n):
+    requests = []
+    for _ in range(n):
+        username = f'{USERNAME_PREFIX}-register-{uuid.uuid4().hex[:12]}'
+        requests.append(Request('POST', '/auth/register', json={'username': username, 'password': PASSWORD}))
+    return requests
+
+def upload_avatar(ctx, n):
+    avatar = base64.b64encode(png_bytes(64, 64, (40, 120, 200))).decode()
+    return [Request('POST', '/auth/avatar', ctx.auth, json={'avatar': avatar}) for _ in range(n)]
+
+def create_trades(ctx, n):
+    return [Request('POST', '/trades/', ctx.auth, form=trade_form(ctx, i)) for i in range(n)]
+
+def import_trades(ctx, n):
+    return [Request('POST', '/trades/import?format=ndjson', ctx.auth, body=import_body(ctx, i),
+                    content_type='application/x-ndjson') for i in range(max(1, n // 10))]
+
+def update_trades(ctx, n):
+    return [Request('PUT', f'/trades/{trade_id}', ctx.auth, form={'total_pnl': '99.5', 'setup_type': 'B'})
+            for trade_id in ctx.bench_trade_ids()[:n]]
+
+def delete_trades(ctx, n):
+    return [Request('DELETE', f'/trades/{trade_id}', ctx.auth) for trade_id in ctx.bench_trade_ids()]
+
+def create_notes(ctx, n):
+    return [Request('POST', '/notes/', ctx.auth, json={'title': BENCH_TICKER, 'content': f'Benchmark note {i}'})
+            for i in range(n)]
+
+def update_notes(ctx, n):
+    return [Request('PUT', f'/notes/{note_id}', ctx.auth, json={'content': 'Updated benchmark note'})
+            for note_id in ctx.bench_note_ids()[:n]]
+
+def delete_notes(ctx, n):
+    return [Request('DELETE', f'/notes/{note_id}', ctx.auth) for note_id in ctx.bench_note_ids()]
+
+def create_playbooks(ctx, n):
+    body = {'title': BENCH_TICKER, 'entry_model': 'Breakout', 'trade_model': 'Intraday', 'setup_grade': 'A',
+            'confluences': ['EMA Cross'], 'tags': ['bench']}
+    return [Request('POST', '/playbooks/', ctx.auth, json=body) for _ in range(n)]
+
+def update_playbooks(ctx, n):
+    return [Request('PUT', f'/playbooks/{playbook_id}', ctx.auth, json={'setup_grade': 'B'})
+            for playbook_id in ctx.bench_playbook_ids()[:n]]
+
+def delete_playbooks(ctx, n):
+    return [Request('DELETE', f'/playbooks/{playbook_id}', ctx.auth) for playbook_id in ctx.bench_playbook_ids()]
+
+SCENARIOS = (
+    Scenario('auth.login', lambda ctx, n: [Request('POST', '/auth/login', ctx.basic_auth) for _ in range(n)], limit=20),
+    Scenario('auth.user', get('/auth/user')),
+    Scenario('auth.avatar', get(lambda ctx, i: ctx.user['avatar_url'])),
+    Scenario('trades.list_page', get('/trades/?limit=100')),
+    Scenario('trades.list_month', get(lambda ctx, i: f'/trades/?month={ctx.month}')),
+    Scenario('trades.list_month_fields',
+             get(lambda ctx, i: f'/trades/?month={ctx.month}&fields=ticker,total_pnl,entry_datetime,result')),
+    Scenario('trades.list_confluence', get('/trades/?confluence=Order%20Block&limit=100')),
+    Scenario('trades.list_conditional', conditional_trades, expect=(304,)),
+    Scenario('trades.detail', get(lambda ctx, i: f'/trades/{ctx.pick(ctx.trade_ids, i)}')),
+    Scenario('trades.stats', get('/trades/stats')),
+    Scenario('trades.stats_range', get(lambda ctx, i: f'/trades/stats?month={ctx.month}')),
+    Scenario('trades.stats_confluences', get('/trades/stats/confluences')),
+    Scenario('trades.analytics', get('/trades/analytics'), limit=20),
+    Scenario('trades.calendar', get(lambda ctx, i: f'/trades/calendar?month={ctx.month}')),
+    Scenario('trades.export_month', get(lambda ctx, i: f'/trades/export?format=csv&month={ctx.month}')),
+    Scenario('trades.screenshot_thumb',
+             get(lambda ctx, i: f'/trades/screenshots/{ctx.pick(ctx.screenshots, i)}?size=thumb')),
+    Scenario('notes.list', get('/notes/')),
+    Scenario('notes.list_fields', get('/notes/?fields=id,title,created_at')),
+    Scenario('notes.list_page', get('/notes/?limit=100')),
+    Scenario('notes.detail', get(lambda ctx, i: f'/notes/{ctx.pick(ctx.note_ids, i)}')),
+    Scenario('notes.export', get('/notes/export?format=ndjson'), limit=20),
+    Scenario('playbooks.list', get('/playbooks/')),
+    Scenario('playbooks.detail', get(lambda ctx, i: f'/playbooks/{ctx.pick(ctx.playbook_ids, i)}')),
+    Scenario('events.month', get(lambda ctx, i: f'/events/?start={ctx.month}-01&end={ctx.month}-28', headers={})),
+    Scenario('search', get(lambda ctx, i: f"/search/?q={('breakout', 'liquidity+sweep', 'retest', 'patien')[i % 4]}")),
+    Scenario('batch.dashboard', batch),
+    Scenario('system.caches', get('/system/caches')),
+    Scenario('auth.register', register, expect=(201,), limit=20, writes=True),
+    Scenario('auth.upload_avatar', upload_avatar, writes=True),
+    Scenario('trades.create', create_trades, expect=(201,), writes=True),
+    Scenario('trades.import', import_trades, writes=True),
+    Scenario('trades.update', update_trades, writes=True),
+    Scenario('trades.delete', delete_trades, writes=True),
+    Scenario('notes.create', create_notes, expect=(201,), writes=True),
+    Scenario('notes.update', update_notes, writes=True),
+    Scenario('notes.delete', delete_notes, writes=True),
+    Scenario('playbooks.create', create_playbooks, expect=(201,), writes=True),
+    Scenario('playbooks.update', update_playbooks, writes=True),
+    Scenario('playbooks.delete', delete_playbooks, writes=True),
+)
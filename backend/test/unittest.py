@@ -59,6 +59,14 @@ def test_notes():
     print_response("Get All Notes", response)
     note_id = response.json()['notes'][0]['id']
 
+    # Get a page of notes
+    response = requests.get(f"{BASE_URL}/notes/", params={"limit": 1, "fields": "title,excerpt"}, headers=headers)
+    print_response("Get Notes (paginated)", response)
+
+    # Search Notes
+    response = requests.get(f"{BASE_URL}/search/", params={"q": "test note"}, headers=headers)
+    print_response("Search Notes", response)
+
     # Get Note by ID
     response = requests.get(f"{BASE_URL}/notes/{note_id}", headers=headers)
     print_response("Get Note by ID", response)
@@ -106,6 +114,36 @@ def test_trades(image_content):
     trade_id = response.json()['trades'][0]['id']
     screenshot_filename = response.json()['trades'][0]['screenshot_filename']
 
+    # Get All Trades, projecting only the list columns
+    response = requests.get(f"{BASE_URL}/trades/", params={"fields": "ticker,total_pnl,entry_datetime"}, headers=headers)
+    print_response("Get All Trades (fields)", response)
+
+    # Get All Trades again with the ETag; unchanged data answers 304
+    response = requests.get(f"{BASE_URL}/trades/", headers={**headers, "If-None-Match": response.headers.get('ETag', '')})
+    print_response("Get All Trades (conditional)", response)
+
+    # Import Trades (NDJSON)
+    import_row = {key: value for key, value in trade_data.items()}
+    import_row["ticker"] = "NVDA"
+    response = requests.post(f"{BASE_URL}/trades/import?format=ndjson", data=json.dumps(import_row) + "\n", headers=headers)
+    print_response("Import Trades", response)
+
+    # Get Trade Stats
+    response = requests.get(f"{BASE_URL}/trades/stats", headers=headers)
+    print_response("Get Trade Stats", response)
+
+    # Get Confluence Stats
+    response = requests.get(f"{BASE_URL}/trades/stats/confluences", headers=headers)
+    print_response("Get Confluence Stats", response)
+
+    # Get Trade Analytics
+    response = requests.get(f"{BASE_URL}/trades/analytics", headers=headers)
+    print_response("Get Trade Analytics", response)
+
+    # Get Trade Calendar
+    response = requests.get(f"{BASE_URL}/trades/calendar?month=2025-09", headers=headers)
+    print_response("Get Trade Calendar", response)
+
     # Get Trade by ID
     response = requests.get(f"{BASE_URL}/trades/{trade_id}", headers=headers)
     print_response("Get Trade by ID", response)
@@ -118,6 +156,12 @@ def test_trades(image_content):
     else:
         print("Screenshot content does not match uploaded content.")
 
+    # Get Screenshot thumbnail, then again with its ETag
+    response = requests.get(f"{BASE_URL}/trades/screenshots/{screenshot_filename}?size=thumb", headers=headers)
+    print_response("Get Screenshot Thumbnail", response)
+    response = requests.get(f"{BASE_URL}/trades/screenshots/{screenshot_filename}?size=thumb", headers={**headers, "If-None-Match": response.headers.get('ETag', '')})
+    print_response("Get Screenshot Thumbnail (conditional)", response)
+
     # Update Trade
     update_data = {"ticker": "MSFT"}
     response = requests.put(f"{BASE_URL}/trades/{trade_id}", data=update_data, headers=headers)
@@ -156,6 +200,10 @@ def test_playbooks():
     response = requests.get(f"{BASE_URL}/playbooks/{playbook_id}", headers=headers)
     print_response("Get Playbook by ID", response)
 
+    # Get Trades Linked to the Playbook
+    response = requests.get(f"{BASE_URL}/trades/", params={"playbook_id": playbook_id}, headers=headers)
+    print_response("Get Trades for Playbook", response)
+
     # Update Playbook
     update_data = {"title": "Updated Breakout Strategy"}
     response = requests.put(f"{BASE_URL}/playbooks/{playbook_id}", json=update_data, headers=headers)
@@ -170,6 +218,19 @@ def test_events():
     response = requests.get(f"{BASE_URL}/events")
     print_response("Get Events", response)
 
+    response = requests.get(f"{BASE_URL}/events", params={"start": "2024-07-01", "end": "2024-07-31", "type": "earnings"})
+    print_response("Get Events (range and type)", response)
+
+def test_change_stream():
+    print("--- Testing Change Stream ---")
+    # EventSource passes the token in the query string; read the first event and disconnect
+    with requests.get(f"{BASE_URL}/events/stream", params={"token": token}, stream=True, timeout=10) as response:
+        print(f"--- Stream Changes ---\nStatus Code: {response.status_code}")
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                break
+            print(line)
+
 def test_user_and_avatar():
     print("--- Testing User and Avatar ---")
     headers = {"Authorization": f"Bearer {token}"}
@@ -178,6 +239,11 @@ def test_user_and_avatar():
     response = requests.get(f"{BASE_URL}/auth/user", headers=headers)
     print_response("Get User", response)
 
+    # Batch several reads into one round trip
+    batch = {"requests": [{"path": "/auth/user"}, {"path": "/trades/stats"}, {"path": "/notes/"}]}
+    response = requests.post(f"{BASE_URL}/batch", json=batch, headers=headers)
+    print_response("Batch Requests", response)
+
     # Upload Avatar
     avatar_data = {"avatar": "SGVsbG8gV29ybGQ="} # base64 encoded "Hello World"
     response = requests.post(f"{BASE_URL}/auth/avatar", json=avatar_data, headers=headers)
@@ -187,6 +253,17 @@ def test_user_and_avatar():
     response = requests.get(f"{BASE_URL}/auth/user", headers=headers)
     print_response("Get User After Avatar Upload", response)
 
+    # Get Avatar, then again with its ETag
+    avatar_url = response.json().get('avatar_url')
+    response = requests.get(f"{BASE_URL}{avatar_url}")
+    print_response("Get Avatar", response)
+    response = requests.get(f"{BASE_URL}{avatar_url}", headers={"If-None-Match": response.headers.get('ETag')})
+    print_response("Get Avatar (conditional)", response)
+
+    # Cache statistics, including the trade cache filled by the reads above
+    response = requests.get(f"{BASE_URL}/system/caches", headers=headers)
+    print_response("Get Cache Statistics", response)
+
 if __name__ == "__main__":
     # It's recommended to run the Flask app in a separate terminal
     # And then run this script.
@@ -204,4 +281,5 @@ if __name__ == "__main__":
         test_trades(image_content)
         test_playbooks()
         test_events()
+        test_change_stream()
         test_user_and_avatar()
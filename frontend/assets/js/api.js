@@ -81,10 +81,21 @@ const getTrades = (params) => {
     }
     return request(endpoint);
 };
+const getTradeStats = (params) => {
+    let endpoint = '/trades/stats';
+    if (params) {
+        const query = new URLSearchParams(params).toString();
+        endpoint += `?${query}`;
+    }
+    return request(endpoint);
+};
+const getTradeCalendar = (month) => request(`/trades/calendar?month=${month}`);
 const getTrade = (id) => request(`/trades/${id}`);
 const createTrade = (tradeData) => request('/trades/', 'POST', tradeData);
 const updateTrade = (id, tradeData) => request(`/trades/${id}`, 'PUT', tradeData);
 const deleteTrade = (id) => request(`/trades/${id}`, 'DELETE');
+// size is 'thumb', 'preview' or 'original'
+const getScreenshot = (filename, size = 'original') => request(`/trades/screenshots/${filename}?size=${size}`);
 
 const getNotes = (params) => {
     let endpoint = '/notes/';
@@ -99,6 +110,9 @@ const createNote = (noteData) => request('/notes/', 'POST', noteData);
 const updateNote = (id, noteData) => request(`/notes/${id}`, 'PUT', noteData);
 const deleteNote = (id) => request(`/notes/${id}`, 'DELETE');
 
+// Full-text search over notes and trade journal text; params are q, type, limit, offset
+const searchJournal = (params) => request(`/search/?${new URLSearchParams(params).toString()}`);
+
 const getPlaybooks = () => request('/playbooks/');
 const getPlaybook = (id) => request(`/playbooks/${id}`);
 const createPlaybook = (playbookData) => request('/playbooks/', 'POST', playbookData);
@@ -108,4 +122,25 @@ const deletePlaybook = (id) => request(`/playbooks/${id}`, 'DELETE');
 const getUser = () => request('/auth/user');
 const uploadAvatar = (avatarData) => request('/auth/avatar', 'POST', avatarData);
 
-const getEvents = () => request('/events');
+// params are start, end (YYYY-MM-DD), type and symbol; defaults to the next 30 days
+const getEvents = (params) => {
+    let endpoint = '/events';
+    if (params) {
+        const query = new URLSearchParams(params).toString();
+        endpoint += `?${query}`;
+    }
+    return request(endpoint);
+};
+
+// Runs several GET requests in one round trip; each item is { path, query, etag }
+const batchRequests = (requests) => request('/batch', 'POST', { requests });
+
+// Live change feed. onChange receives { entity, id, op, version } for every trade,
+// note or playbook write; onReset is called when changes may have been missed and
+// everything shown should be reloaded. EventSource reconnects by itself.
+const subscribeToChanges = (onChange, onReset) => {
+    const source = new EventSource(`${API_BASE_URL}/events/stream?token=${encodeURIComponent(getToken())}`);
+    source.addEventListener('change', (e) => onChange(JSON.parse(e.data)));
+    source.addEventListener('reset', () => onReset());
+    return source;
+};